@@ -1,27 +1,123 @@
+import hashlib
 import streamlit as st
-import requests
-from modules.summarizer import analyze_pdf 
-from modules.pdf_extractor import extract_text_from_pdf
+from modules.cache import TieredCache
+from modules.llm_client import call_llm, chat_completion, stream_chat
+from modules.map_reduce import BRIEF_TOKENS, map_reduce_summary
+from modules.pdf_extractor import count_pdf_pages, iter_pdf_pages
 from modules.prompts import user_prompts
-from pages.mistype_cleaner import process_text_pipeline
+from modules.token_budget import fit_input, input_budget
+from modules.utils import get_setting
 import re
 
+# Heavy dependencies (scikit-learn, wordcloud, transformers) are imported inside
+# the code paths that need them so the task buttons paint without waiting on them.
+# Check with: python -m benchmarks.import_time
+
+PDF_CACHE_MAX_ITEMS = int(get_setting("PDF_CACHE_MAX_ITEMS", 16))
+PDF_CACHE_MAX_BYTES = int(get_setting("PDF_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+PDF_BATCH_PAGES = int(get_setting("PDF_BATCH_PAGES", 10))
+SUMMARY_TOKENS = int(get_setting("SUMMARY_TOKENS", 1500))  # most a PDF's key sentences may take
+
+@st.cache_resource
+def get_pdf_cache():
+    """PDF analyses shared across sessions, keyed by the SHA-256 of the file bytes."""
+    return TieredCache("pdf_analysis", max_items=PDF_CACHE_MAX_ITEMS, max_bytes=PDF_CACHE_MAX_BYTES)
+
+@st.cache_resource
+def get_word_cloud_cache():
+    return TieredCache("word_clouds", max_items=32, max_bytes=64 * 1024 * 1024)
+
+def get_word_cloud_png(analysis_key, frequencies):
+    """Render (or fetch the already rendered) word cloud for an analysed PDF."""
+    from modules.summarizer import render_word_cloud
+    cache = get_word_cloud_cache()
+    png = cache.get(analysis_key)
+    if png is None:
+        png = render_word_cloud(frequencies)
+        if png is not None:
+            cache.set(analysis_key, png)
+    return png
+
+@st.cache_resource
+def get_pdf_summary_cache():
+    return TieredCache("pdf_summaries", max_items=64, max_bytes=64 * 1024 * 1024)
+
+def get_pdf_summary(analysis_key, token_budget):
+    """Key sentences of an analysed PDF within `token_budget`, computed once per budget."""
+    from modules.summarizer import textrank_summary
+    cache = get_pdf_summary_cache()
+    summary_key = f"{analysis_key}:{token_budget}"
+    summary = cache.get(summary_key)
+    if summary is None:
+        result_data = get_pdf_cache().get(analysis_key)
+        if result_data is None:
+            return ""
+        summary = textrank_summary("\n".join(result_data["pages"]), token_budget)
+        cache.set(summary_key, summary)
+    return summary
+
+def get_pdf_brief(analysis_key, token_budget):
+    """LLM brief of an analysed PDF; unchanged chunks are answered from the response cache."""
+    result_data = get_pdf_cache().get(analysis_key)
+    if result_data is None:
+        return ""
+    progress = st.progress(0.0, text="Summarizing the document...")
+    def show_progress(done, total, stage):
+        label = "Summarizing sections" if stage == "map" else "Combining summaries"
+        progress.progress(done / total, text=f"{label}... {done} of {total}")
+    result = map_reduce_summary(result_data["pages"], token_budget, progress=show_progress)
+    progress.empty()
+    if result["failed"]:
+        st.warning(f"⚠️ {result['failed']} of {result['chunks']} sections could not be summarized and were left out.")
+    return result["brief"]
+
+def analyze_pdf_incrementally(pdf_file, doc_id, max_pages=None):
+    """Extract and analyse a PDF a batch of pages at a time, showing keywords as they emerge."""
+    from modules.idf_model import get_idf_model
+    from modules.summarizer import KeywordAccumulator, resolve_keyword_extractor, word_cloud_frequencies
+
+    total = count_pdf_pages(pdf_file)
+    if max_pages:
+        total = min(total, max_pages)
+    progress = st.progress(0.0, text="Analyzing PDF...")
+    preview = st.empty()
+
+    accumulator = KeywordAccumulator()
+    pages, batch = [], []
+    for page_text in iter_pdf_pages(pdf_file, max_pages=max_pages):
+        pages.append(page_text)
+        batch.append(page_text)
+        if len(batch) == PDF_BATCH_PAGES or len(pages) == total:
+            accumulator.update("\n".join(batch))
+            batch = []
+            progress.progress(len(pages) / max(total, 1), text=f"Analyzing PDF... page {len(pages)} of {total}")
+            preview.markdown("**Keywords so far:** " + ", ".join(accumulator.keywords(num_keywords=20)["TF-IDF"]))
+    if batch:
+        accumulator.update("\n".join(batch))
+
+    progress.empty()
+    preview.empty()
+
+    # Rank against IDF learned from earlier uploads, then add this document to it
+    idf_model = get_idf_model()
+    # Only the embedding extractor reads the text, so only then is it joined
+    text = "\n".join(pages) if resolve_keyword_extractor() == "embedding" else None
+    with st.spinner("Ranking keywords..."):
+        keywords = accumulator.keywords(idf_model=idf_model, text=text)
+    # Only whole documents are counted: the IDF model keys them by file hash,
+    # so a first-N-pages analysis would block the full one from being added
+    if not max_pages and idf_model.add_document(doc_id, list(accumulator.counts)):
+        idf_model.save()
+    return {
+        "pages": pages,
+        "keywords": keywords,
+        "frequencies": word_cloud_frequencies(accumulator.counts),
+    }
+
 def clean_user_input(text):
     return re.sub(r"[^\w\s.,?!-]", "", text)
 
 
-def call_llm(prompt, user_input):
-    response = requests.post(
-        LLM_API_URL,
-        json={
-            "messages": [
-                {"role": "system", "content": prompt.strip()},
-                {"role": "user", "content": user_input.strip()},
-            ]
-        }
-    )
-    return response.json()["choices"][0]["message"]["content"]
-
 def differentiate_resource_chain(user_input):
     # Step 1: Analysis
     analysis_prompt = (
@@ -148,9 +244,6 @@ def render_mcq_cards(mcqs):
             </div>
         """, unsafe_allow_html=True)
 
-# --- Set API call URL ---
-LLM_API_URL = st.secrets["LLM_API_URL"]
-
 # --- Page Config ---
 st.set_page_config(page_title="Prompt Tester", layout="centered")
 st.title("OI-TA")
@@ -263,30 +356,54 @@ if input_method == "Upload PDF":
         # Optional: Let user re-trigger analysis manually
         reanalyze = st.button("🔁 Reanalyze PDF")
 
-        # Always process if: new file OR user forces reanalysis
-        if reanalyze or st.session_state.get("last_uploaded_filename") != uploaded_file.name:
-            with st.spinner("Analyzing PDF..."):
-                text = extract_text_from_pdf(uploaded_file)
-                result_data = analyze_pdf(text)
+        max_pages = st.number_input(
+            "Only analyse the first N pages (0 = whole document)", min_value=0, value=0, step=10,
+            help="For long documents the opening chapters are often enough context."
+        )
 
-                # Save image
-                st.session_state["img_base64"] = result_data["wordcloud"]
-                st.session_state["last_uploaded_filename"] = uploaded_file.name
+        # Identify the upload by content, not name, so renamed copies share a result
+        pdf_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        analysis_key = f"{pdf_hash}:{max_pages}" if max_pages else pdf_hash
 
-                # Save keywords and formatted user_input
-                keywords = result_data.get("keywords", {})
-                st.session_state["extracted_keywords"] = keywords
+        # Always process if: new file OR user forces reanalysis
+        if reanalyze or st.session_state.get("last_pdf_hash") != analysis_key:
+            pdf_cache = get_pdf_cache()
+            result_data = None if reanalyze else pdf_cache.get(analysis_key)
+            if result_data is None:
+                result_data = analyze_pdf_incrementally(uploaded_file, pdf_hash, max_pages=max_pages or None)
+                pdf_cache.set(analysis_key, result_data)
+
+            # Save term counts; the word cloud is drawn only if requested below
+            st.session_state["word_cloud_frequencies"] = result_data["frequencies"]
+            st.session_state["last_pdf_hash"] = analysis_key
+
+            # Save keywords and formatted user_input
+            keywords = result_data.get("keywords", {})
+            st.session_state["extracted_keywords"] = keywords
+
+            flat_keywords = [word for group in keywords.values() for word in group]
+            if flat_keywords:
+                st.session_state["user_input"] = "\n\n[Extracted Keywords]\n" + ", ".join(flat_keywords)
+            else:
+                st.session_state["user_input"] = "⚠️ No keywords could be extracted."
 
-                flat_keywords = [word for group in keywords.values() for word in group]
-                if flat_keywords:
-                    st.session_state["user_input"] = "\n\n[Extracted Keywords]\n" + ", ".join(flat_keywords)
-                else:
-                    st.session_state["user_input"] = "⚠️ No keywords could be extracted."
+        include_summary = st.checkbox(
+            "📄 Include key sentences from the document", value=True,
+            help="Sends the document's most central sentences along with the keywords."
+        )
+        include_brief = st.checkbox(
+            "🧩 Summarize the whole document with the AI first (slower, for long PDFs)",
+            help="Each section is summarized, then the summaries are combined into one brief for the task."
+        )
 
         # Always show stored results
-        # if st.session_state.get("img_base64"):
-        #     st.subheader("Generated Word Cloud")
-        #     st.image(f"data:image/png;base64,{st.session_state['img_base64']}")
+        if st.toggle("☁️ Show word cloud"):
+            png = get_word_cloud_png(st.session_state["last_pdf_hash"], st.session_state.get("word_cloud_frequencies"))
+            if png:
+                st.subheader("Generated Word Cloud")
+                st.image(png)
+            else:
+                st.markdown("⚠️ Not enough text for a word cloud.")
 
         # if st.session_state.get("extracted_keywords"):
         #     st.markdown("### 🧠 Extracted Keywords")
@@ -356,6 +473,8 @@ st.markdown("""
     <div style="margin-top:2rem;margin-bottom:1rem;border-bottom:2px solid #ccc;"></div>
 """, unsafe_allow_html=True)
 st.markdown("### Now Generate the Output")
+stream_output = st.checkbox("Show the answer as it is written", value=True)
+regenerate = st.checkbox("🔁 Regenerate (don't reuse a saved answer)", help="Identical requests are answered from a cache unless this is ticked.")
 
 if st.button("🚀 Generate Output", key="generate_btn"):
     task_key = selected_subtask if selected_task == "Reformat & Repurpose Resource" else selected_task
@@ -365,13 +484,14 @@ if st.button("🚀 Generate Output", key="generate_btn"):
         user_input = st.session_state.get("user_input", "").strip()
 
     else:
+        from modules.text_processing import process_text_pipeline
         user_input = st.session_state.get("user_input", "").strip()
         user_input = process_text_pipeline(user_input)
 
     
     # --- Get extracted keywords from session ---
     keywords = st.session_state.get("extracted_keywords", {})
-    keyword_summary = ""
+    unique_keywords = []
     if keywords:
         # Flatten all keyword lists into one combined list
         flat_keywords = []
@@ -380,9 +500,6 @@ if st.button("🚀 Generate Output", key="generate_btn"):
     
         # Deduplicate and trim
         unique_keywords = list(dict.fromkeys(flat_keywords))[:250] 
-        keyword_summary = "\n\n" + ", ".join(unique_keywords)
-
-    full_input = f"User Input: {user_input}{keyword_summary}"
 
     user_prompt_template = user_prompts[task_key]
     user_prompt = user_prompt_template.format(
@@ -393,6 +510,33 @@ if st.button("🚀 Generate Output", key="generate_btn"):
         num_templates=num_templates
     )
 
+    # --- Add the PDF's key sentences and brief, each within a share of what the prompt leaves ---
+    if input_method == "Upload PDF" and uploaded_file and include_summary:
+        summary_budget = min(SUMMARY_TOKENS, input_budget(user_prompt, "User Input: \n\n") // 2)
+        with st.spinner("Selecting key sentences..."):
+            summary = get_pdf_summary(st.session_state["last_pdf_hash"], summary_budget)
+        if summary:
+            user_input = "[Key Sentences]\n" + summary + "\n\n" + user_input.strip()
+
+    if input_method == "Upload PDF" and uploaded_file and include_brief:
+        brief_budget = min(BRIEF_TOKENS, input_budget(user_prompt, "User Input: \n\n") // 2)
+        try:
+            brief = get_pdf_brief(st.session_state["last_pdf_hash"], brief_budget)
+        except Exception as e:
+            brief = ""
+            st.error(f"Could not summarize the document: {e}")
+        if brief:
+            user_input = "[Document Brief]\n" + brief + "\n\n" + user_input.strip()
+
+    # --- Fit the input into what the context window leaves after the prompt ---
+    budgeted = fit_input(user_input, unique_keywords, input_budget(user_prompt, "User Input: \n\n"))
+    user_input = budgeted["text"]
+    keyword_summary = "\n\n" + ", ".join(budgeted["keywords"]) if budgeted["keywords"] else ""
+    if budgeted["saved"]:
+        st.info(f"✂️ Input shortened to fit the model's context window: {budgeted['saved']:,} tokens left out, {budgeted['tokens']:,} sent.")
+
+    full_input = f"User Input: {user_input}{keyword_summary}"
+
     if selected_task != "Emotion Check-in Templates" and not user_input.strip():
         st.warning("⚠️ Please enter some content or upload a PDF above.")
 
@@ -408,22 +552,27 @@ if st.button("🚀 Generate Output", key="generate_btn"):
                         f"[Differentiation Prompt]\n{differentiation_prompt}\n\n[Combined Input]\n{combined_input}",
                         language="markdown")
 
-        response = requests.post(
-            LLM_API_URL,
-            json={
-                "messages": [
-                    {"role": "system", "content": user_prompt.strip()},
-                    {"role": "user", "content": full_input.strip()},
-                ]
-            }
-        )
-
-        try:
-            output = response.json()["choices"][0]["message"]["content"]
-        except Exception as e:
-            st.error(f"❌ Failed to parse API response: {e}")
-            st.code(response.text)
-            output = "[No output returned]"
+        messages = [
+            {"role": "system", "content": user_prompt.strip()},
+            {"role": "user", "content": full_input.strip()},
+        ]
+
+        if stream_output:
+            # Render tokens as they arrive, then clear so the usual layout below takes over
+            stream_box = st.empty()
+            try:
+                with stream_box.container():
+                    output = st.write_stream(stream_chat(messages, cache=True, refresh=regenerate))
+            except Exception as e:
+                st.error(f"❌ Failed to stream API response: {e}")
+                output = "[No output returned]"
+            stream_box.empty()
+        else:
+            try:
+                output = chat_completion(messages, cache=True, refresh=regenerate)
+            except Exception as e:
+                st.error(f"❌ Failed to get API response: {e}")
+                output = "[No output returned]"
 
         
         if selected_task == "Reformat & Repurpose Resource" and selected_subtask == "Convert to Flashcards":
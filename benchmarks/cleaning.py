@@ -0,0 +1,95 @@
+"""Throughput of clean_user_input on multi-megabyte text.
+
+Run from the repository root:
+
+    python -m benchmarks.cleaning              # 4 MB of generated text
+    python -m benchmarks.cleaning --mb 16
+
+The single-scan cleaner is compared with the previous placeholder-based
+implementation (kept below as the reference), after checking both against
+the expected output for the ten examples on the mistype cleaner page.
+"""
+import argparse
+import random
+import re
+import time
+from modules.text_processing import clean_user_input
+
+# The ten cleaning examples from pages/mistype_cleaner.py and their expected output
+EXAMPLES = {
+    "exa,ple": "exaple",
+    '"This is important"': '"This is important"',
+    "C/file/pathdirectory": "C/file/pathdirectory",
+    'He said, "exa,ple" is wrong': 'He said, "exaple" is wrong',
+    "test.ing": "testing",
+    "Check this path: D:\\Documents\\file.txt": "Check this path: D:\\Documents\\file.txt",
+    "but\\this backslas\\h shouldn't be here": "butthis backslash shouldnt be here",
+    "but/this backslas/h shouldn't be here": "butthis backslash shouldnt be here",
+    "Hello, world!": "Hello, world!",
+    "Mistyped,word with, commas inside": "Mistypedword with, commas inside",
+}
+
+WORDS = [
+    "the", "lesson", "homework", "exa,ple", "test.ing", "mis-typed", "it's", "don't", "Hello,",
+    "world!", "C:/Users/teacher/plan.docx", "/home/class/notes.txt", '"quoted, text"', "e-mail",
+]
+
+
+def placeholder_clean(text):
+    """The previous implementation: three substitutions, a restore pass, recursion into quotes."""
+    protected = []
+    def protect_quotes(match):
+        protected.append(('quote', match.group(0)))
+        return f"__PROTECTED{len(protected)-1}__"
+    def protect_paths(match):
+        protected.append(('path', match.group(0)))
+        return f"__PROTECTED{len(protected)-1}__"
+    text = re.sub(r'(["\'])(?:(?=(\\?))\2.)*?\1', protect_quotes, text)
+    text = re.sub(r'([A-Za-z]:[\\/][^\s"\']+|[\\/](?:[^\s"\']+[\\/])+[^\s"\']+)', protect_paths, text)
+    text = re.sub(r"(?<=\w)[,.;:!?\\\\/'-](?=\w)", '', text)
+    def restore(match):
+        typ, content = protected[int(match.group(1))]
+        if typ == 'quote':
+            return f"{content[0]}{placeholder_clean(content[1:-1])}{content[0]}"
+        return content
+    return re.sub(r'__PROTECTED(\d+)__', restore, text)
+
+
+def make_text(size, seed=0):
+    """About `size` characters of sentences built from WORDS."""
+    rng = random.Random(seed)
+    lines, length = [], 0
+    while length < size:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 20))) + "."
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=4, help="input size in megabytes")
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per cleaner (best is kept)")
+    args = parser.parse_args()
+
+    for name, clean in (("single-scan", clean_user_input), ("placeholder", placeholder_clean)):
+        wrong = [text for text, expected in EXAMPLES.items() if clean(text) != expected]
+        if wrong:
+            raise SystemExit(f"{name} cleaner differs on: {wrong}")
+
+    text = make_text(int(args.mb * 1024 * 1024))
+    print(f"Input: {len(text) / 1024 / 1024:.1f} MB, {text.count(chr(10)) + 1} lines\n")
+    print(f"{'cleaner':<12} {'best s':>8} {'MB/s':>8}")
+    outputs = {}
+    for name, clean in (("single-scan", clean_user_input), ("placeholder", placeholder_clean)):
+        best = float("inf")
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            outputs[name] = clean(text)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<12} {best:8.2f} {len(text) / 1024 / 1024 / best:8.1f}")
+    print(f"\nSame output: {outputs['single-scan'] == outputs['placeholder']}")
+
+
+if __name__ == "__main__":
+    main()
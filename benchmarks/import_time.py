@@ -0,0 +1,84 @@
+"""Cold-start import profile of app.py, with an optional time budget.
+
+Run from the repository root:
+
+    python -m benchmarks.import_time                    # report only
+    python -m benchmarks.import_time --budget-ms 1500   # exit 1 if over budget
+    python -m benchmarks.import_time -m modules.summarizer   # profile other modules
+
+The modules imported at the top level of app.py are imported in a fresh
+interpreter under `python -X importtime`, so every number is a cold import.
+Imports inside functions or branches are lazy and not counted.
+"""
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:       self |  cumulative |   [indent]package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def startup_imports(script):
+    """Modules imported at the top level of `script`."""
+    with open(script, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def profile_imports(modules):
+    """Import `modules` in a fresh interpreter; return (self_us, cumulative_us, depth, name) rows."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode:
+        sys.exit(f"Import failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, name))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--script", default="app.py", help="script whose top-level imports are profiled")
+    parser.add_argument("-m", "--module", action="append", help="profile these modules instead")
+    parser.add_argument("--top", type=int, default=15, help="number of packages to list")
+    parser.add_argument("--budget-ms", type=float, help="fail if the total import time exceeds this")
+    args = parser.parse_args()
+
+    modules = args.module or startup_imports(os.path.join(ROOT, args.script))
+    rows = profile_imports(modules)
+    # Interpreter start-up (site, encodings, ...) also shows at depth 0; leave it out
+    total_ms = sum(cumulative for _, cumulative, depth, name in rows if depth == 0 and name in modules) / 1000
+
+    print(f"Profiled: {', '.join(modules)}")
+    print(f"Total import time: {total_ms:.0f} ms\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  package")
+    top_level = sorted((row for row in rows if row[2] == 0), key=lambda row: row[1], reverse=True)
+    for self_us, cumulative_us, _, name in top_level[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    if args.budget_ms is not None:
+        if total_ms > args.budget_ms:
+            print(f"\nOver budget: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+            sys.exit(1)
+        print(f"\nWithin budget: {total_ms:.0f} ms <= {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
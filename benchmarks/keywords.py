@@ -0,0 +1,77 @@
+"""Latency and quality of the embedding keyword extractor against TF-IDF.
+
+Run from the repository root (the embedding extractor needs
+sentence-transformers):
+
+    python -m benchmarks.keywords                  # 60 generated pages
+    python -m benchmarks.keywords --pages 200 --keywords 50
+    python -m benchmarks.keywords --pdf textbook.pdf
+
+Generated pages mix six topic vocabularies with classroom words and filler
+(see benchmarks.summary.make_pages). Quality is the share of keywords with a
+topic word in them and the number of topics the list covers. For a --pdf
+only the overlap of the two lists is reported. The embedding extractor is
+timed with an empty phrase store ("cold") and again once the store holds
+the document's vocabulary ("warm").
+"""
+import argparse
+import tempfile
+import time
+from benchmarks.summary import TOPICS, make_pages
+from modules.summarizer import extract_keywords_tfidf
+
+
+def quality(keywords):
+    """(share of keywords containing a topic word, number of topics covered)."""
+    topic_of = {word: n for n, words in enumerate(TOPICS) for word in words}
+    found = [{topic_of[w] for w in keyword.split() if w in topic_of} for keyword in keywords]
+    on_topic = sum(1 for topics in found if topics)
+    return on_topic / (len(keywords) or 1), len(set().union(*found))
+
+
+def timed(extract, text, num_keywords):
+    start = time.perf_counter()
+    keywords = extract(text, num_keywords=num_keywords)
+    return keywords, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=60, help="generated pages (ignored with --pdf)")
+    parser.add_argument("--pdf", help="extract from this PDF instead of generated text")
+    parser.add_argument("--keywords", type=int, default=30, help="keywords per list")
+    args = parser.parse_args()
+
+    if args.pdf:
+        from modules.pdf_extractor import extract_text_from_pdf
+        with open(args.pdf, "rb") as f:
+            text = extract_text_from_pdf(f.read())
+    else:
+        text = "\n".join(make_pages(args.pages))
+
+    import modules.keyword_embeddings as keyword_embeddings
+    keyword_embeddings.EMBEDDING_STORE_DIR = tempfile.mkdtemp(prefix="embeddings-")
+    start = time.perf_counter()
+    keyword_embeddings.load_embedding_model()
+    load_s = time.perf_counter() - start
+    extract_keywords_tfidf("warm up scikit-learn", num_keywords=1)
+
+    results = {"tf-idf": timed(extract_keywords_tfidf, text, args.keywords)}
+    results["embedding cold"] = timed(keyword_embeddings.extract_keywords_embedding, text, args.keywords)
+    results["embedding warm"] = timed(keyword_embeddings.extract_keywords_embedding, text, args.keywords)
+
+    print(f"Input: {len(text.split()):,} words; model loaded in {load_s:.1f}s; "
+          f"{len(keyword_embeddings.get_embedding_store()):,} phrases stored\n")
+    print(f"{'extractor':<15} {'s':>7} {'on topic':>9} {'topics':>7}")
+    for name, (keywords, seconds) in results.items():
+        on_topic, topics = quality(keywords) if not args.pdf else (float("nan"), 0)
+        print(f"{name:<15} {seconds:7.2f} {on_topic:9.0%} {topics:7d}")
+
+    tfidf, embedding = set(results["tf-idf"][0]), set(results["embedding warm"][0])
+    print(f"\nShared keywords: {len(tfidf & embedding)} of {args.keywords}")
+    for name in ("tf-idf", "embedding warm"):
+        print(f"{name}: {', '.join(results[name][0][:15])}")
+
+
+if __name__ == "__main__":
+    main()
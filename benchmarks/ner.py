@@ -0,0 +1,95 @@
+"""Latency, memory and PER-span agreement of the NER inference backends.
+
+Run from the repository root:
+
+    python -m benchmarks.ner                      # every installed backend
+    python -m benchmarks.ner --backend int8 --runs 50
+
+Each backend runs in a fresh interpreter so its load time and resident
+memory are measured alone. Person spans found in the 30-name sample
+paragraph (modules.ner.NAMES_SAMPLE_TEXT) are compared with those of the
+full-precision "pytorch" backend.
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from benchmarks.import_time import ROOT
+
+
+def measure(backend, runs):
+    """Run in the child interpreter: load `backend` and time it on the sample text."""
+    from modules.ner import NAMES_SAMPLE_TEXT, _resolve_backend, load_ner_model
+    if _resolve_backend(backend) != backend:
+        # load_ner_model would fall back to another backend and time that instead
+        raise SystemExit(f"NER backend {backend!r} is not installed")
+    start = time.perf_counter()
+    ner = load_ner_model(backend)
+    load_s = time.perf_counter() - start
+    entities = ner(NAMES_SAMPLE_TEXT)  # warm-up, and the spans to compare
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        ner(NAMES_SAMPLE_TEXT)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "load_s": load_s,
+        "median_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "spans": sorted((e["start"], e["end"]) for e in entities if e["entity_group"] == "PER"),
+    }
+
+
+def run_backend(backend, runs):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.ner", "--child", "--backend", backend, "--runs", str(runs)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode:
+        print(f"{backend}: failed\n{result.stderr[-2000:]}")
+        return None
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def agreement(spans, reference):
+    """(precision, recall) of `spans` against the reference spans."""
+    found, expected = set(map(tuple, spans)), set(map(tuple, reference))
+    matched = len(found & expected)
+    return matched / (len(found) or 1), matched / (len(expected) or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", action="append", help="backends to compare (default: all installed)")
+    parser.add_argument("--runs", type=int, default=20, help="timed passes over the sample text")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.backend[0], args.runs)))
+        return
+
+    from modules.ner import available_backends
+    backends = args.backend or available_backends()
+    results = {backend: run_backend(backend, args.runs) for backend in dict.fromkeys(["pytorch", *backends])}
+    reference = results["pytorch"]["spans"] if results["pytorch"] else None
+
+    print(f"{'backend':<10} {'load s':>7} {'median ms':>10} {'p95 ms':>8} {'peak MB':>8} {'PER':>4} {'precision':>10} {'recall':>7}")
+    for backend in backends:
+        result = results[backend]
+        if result is None:
+            continue
+        precision, recall = agreement(result["spans"], reference) if reference is not None else (float("nan"),) * 2
+        print(
+            f"{backend:<10} {result['load_s']:7.1f} {result['median_ms']:10.1f} {result['p95_ms']:8.1f} "
+            f"{result['peak_rss_mb']:8.0f} {len(result['spans']):4d} {precision:10.1%} {recall:7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
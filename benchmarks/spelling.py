@@ -0,0 +1,91 @@
+"""Speed and accuracy of the spelling-correction backends on generated typos.
+
+Run from the repository root:
+
+    python -m benchmarks.spelling                  # 500 typos, 1-2 edits each
+    python -m benchmarks.spelling --words 2000 --max-edits 1
+
+Common dictionary words get random deletions, insertions, substitutions or
+transpositions; each backend corrects every typo once, with no memoization,
+and is scored on how often it recovers the original word. The symspell index
+is built on first run (see modules.symspell); its load time is reported
+separately from the lookups.
+"""
+import argparse
+import random
+import string
+import time
+
+
+def make_typos(words, count, max_edits, seed):
+    """(typo, original) pairs; typos that are themselves dictionary words are skipped."""
+    rng = random.Random(seed)
+    vocabulary = set(words)
+    pairs = []
+    while len(pairs) < count:
+        original = typo = rng.choice(words)
+        for _ in range(rng.randint(1, max_edits)):
+            i = rng.randrange(len(typo))
+            edit = rng.choice(("delete", "insert", "substitute", "transpose"))
+            if edit == "delete" and len(typo) > 2:
+                typo = typo[:i] + typo[i + 1:]
+            elif edit == "insert":
+                typo = typo[:i] + rng.choice(string.ascii_lowercase) + typo[i:]
+            elif edit == "transpose" and i < len(typo) - 1:
+                typo = typo[:i] + typo[i + 1] + typo[i] + typo[i + 2:]
+            else:
+                typo = typo[:i] + rng.choice(string.ascii_lowercase) + typo[i + 1:]
+        if typo not in vocabulary:
+            pairs.append((typo, original))
+    return pairs
+
+
+def load_backends():
+    """{name: (correct(word), load seconds)} for every backend that is installed."""
+    backends = {}
+    start = time.perf_counter()
+    from spellchecker import SpellChecker
+    spell = SpellChecker()
+    backends["pyspellchecker"] = (spell.correction, time.perf_counter() - start)
+
+    try:
+        start = time.perf_counter()
+        from autocorrect import Speller
+        speller = Speller(lang="en")
+        backends["autocorrect"] = (speller.autocorrect_word, time.perf_counter() - start)
+    except ImportError:
+        pass
+
+    start = time.perf_counter()
+    from modules.symspell import get_symspell_index
+    index = get_symspell_index()
+    backends["symspell"] = (index.correction, time.perf_counter() - start)
+    return backends, spell
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=500, help="number of typos to correct")
+    parser.add_argument("--max-edits", type=int, default=2, help="edits per typo (1 to this)")
+    parser.add_argument("--min-count", type=int, default=10_000, help="only misspell words at least this frequent")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    backends, spell = load_backends()
+    common = sorted(
+        word for word, count in spell.word_frequency.dictionary.items()
+        if count >= args.min_count and word.isalpha() and len(word) >= 4
+    )
+    pairs = make_typos(common, args.words, args.max_edits, args.seed)
+
+    print(f"{len(pairs)} typos of {len(common)} common words, up to {args.max_edits} edits each\n")
+    print(f"{'backend':<16} {'load s':>8} {'ms/word':>9} {'accuracy':>9}")
+    for name, (correct, load_seconds) in backends.items():
+        start = time.perf_counter()
+        right = sum(correct(typo) == original for typo, original in pairs)
+        per_word_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+        print(f"{name:<16} {load_seconds:8.2f} {per_word_ms:9.2f} {right / len(pairs):9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Speed and token savings of the TextRank summary on long documents.
+
+Run from the repository root:
+
+    python -m benchmarks.summary                   # 150 generated pages
+    python -m benchmarks.summary --pages 400
+    python -m benchmarks.summary --pdf textbook.pdf --budget 1500
+
+The factored power iteration in modules.summarizer.textrank_scores is
+compared with the same ranking over an explicitly built sentence-similarity
+matrix (kept below as the reference), and the summary's token count with the
+whole document's.
+"""
+import argparse
+import random
+import time
+import numpy as np
+from modules.summarizer import TOKEN_PATTERN, summary_sentences, textrank_scores, textrank_summary
+from modules.token_budget import count_tokens
+
+COMMON = (
+    "the pupils teacher lesson learn should each group work understand example question "
+    "answer idea show explain important class year term skill practice"
+).split()
+FILLER = "the a of to and in is that for with as on by it this are can be".split()
+TOPICS = [
+    "photosynthesis plant leaf chlorophyll sunlight glucose oxygen carbon dioxide energy".split(),
+    "fraction numerator denominator equivalent simplify decimal percentage ratio divide".split(),
+    "volcano magma eruption tectonic plate crust lava earthquake mantle".split(),
+    "poem rhyme stanza metaphor simile imagery poet rhythm verse".split(),
+    "empire roman soldier emperor road legion conquest britain villa".split(),
+    "circuit current voltage resistance battery bulb wire switch series".split(),
+]
+
+
+def make_pages(count, seed=0):
+    """`count` pages of about 350 words, a few pages to each topic in turn."""
+    rng = random.Random(seed)
+    pages = []
+    for n in range(count):
+        topic = TOPICS[n // 5 % len(TOPICS)]
+        sentences = []
+        while sum(s.count(" ") + 1 for s in sentences) < 350:
+            words = [rng.choice(rng.choice((topic, COMMON, FILLER, FILLER))) for _ in range(rng.randint(8, 24))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        pages.append(" ".join(sentences))
+    return pages
+
+
+def reference_scores(sentences, damping=0.85, iterations=100):
+    """TextRank with the similarity matrix built explicitly: the quadratic version."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    X = TfidfVectorizer(stop_words='english', token_pattern=TOKEN_PATTERN, sublinear_tf=True).fit_transform(sentences)
+    similarity = (X @ X.T).tocsr()
+    similarity.setdiag(0)
+    out_weight = np.asarray(similarity.sum(axis=1)).ravel()
+    dangling = out_weight <= 1e-12
+    transition_t = similarity.multiply(1 / np.where(dangling, 1, out_weight)[:, None]).T.tocsr()
+    n = len(sentences)
+    scores = np.full(n, 1 / n)
+    for _ in range(iterations):
+        scores = (1 - damping) / n + damping * (transition_t @ scores + scores[dangling].sum() / n)
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=150, help="generated pages (ignored with --pdf)")
+    parser.add_argument("--pdf", help="summarise this PDF instead of generated text")
+    parser.add_argument("--budget", type=int, default=1500, help="summary token budget")
+    parser.add_argument("--no-reference", action="store_true", help="skip the explicit-matrix reference")
+    args = parser.parse_args()
+
+    if args.pdf:
+        from modules.pdf_extractor import iter_pdf_pages
+        with open(args.pdf, "rb") as f:
+            pages = list(iter_pdf_pages(f.read()))
+    else:
+        pages = make_pages(args.pages)
+    text = "\n".join(pages)
+    textrank_scores(summary_sentences(pages[0]))  # import scikit-learn outside the timings
+
+    start = time.perf_counter()
+    sentences = summary_sentences(text)
+    split_s = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = textrank_scores(sentences)
+    rank_s = time.perf_counter() - start
+    start = time.perf_counter()
+    summary = textrank_summary(text, args.budget)
+    total_s = time.perf_counter() - start
+
+    document_tokens, summary_tokens = count_tokens(text), count_tokens(summary)
+    print(f"Input: {len(pages)} pages, {len(sentences):,} sentences, {document_tokens:,} tokens\n")
+    print(f"{'stage':<16} {'s':>8}")
+    print(f"{'split':<16} {split_s:8.2f}")
+    print(f"{'rank':<16} {rank_s:8.2f}")
+    print(f"{'whole summary':<16} {total_s:8.2f}")
+    if not args.no_reference:
+        start = time.perf_counter()
+        reference = reference_scores(sentences)
+        print(f"{'rank (explicit)':<16} {time.perf_counter() - start:8.2f}")
+        print(f"\nLargest score difference from the explicit matrix: {np.abs(reference - scores).max():.2e}")
+    print(
+        f"\nSummary: {summary.count('. ') + 1} sentences, {summary_tokens:,} tokens "
+        f"({summary_tokens / max(document_tokens, 1):.1%} of the document)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+"""Helpers for keeping data in NumPy arrays saved to disk."""
+import hashlib
+import numpy as np
+
+
+def pack_strings(strings):
+    """Newline-joined UTF-8 bytes: far smaller than a fixed-width NumPy string array."""
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+def unpack_strings(array):
+    """Inverse of `pack_strings`."""
+    text = array.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+def hash64(text):
+    """64-bit BLAKE2b hash of `text`, for keys stored in uint64 arrays."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from modules.utils import get_setting
+
+CACHE_DIR = get_setting("CACHE_DIR", ".cache")
+
+
+def content_key(*parts):
+    """SHA-256 hex digest of the JSON encoding of `parts`."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# --- In-memory tier ---
+
+class LRUCache:
+    """Thread-safe in-memory LRU with an optional TTL and hit/miss counters."""
+
+    def __init__(self, max_items=1024, ttl=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, created=None):
+        """Store `value`; its TTL runs from `created` (default: now)."""
+        expires = (created or time.time()) + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+# --- On-disk tier ---
+
+class SQLiteCache:
+    """Pickled values in a SQLite file, with a TTL and a total-size cap.
+
+    When the cap is exceeded the least recently read entries are dropped first.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """(value, created time) for `key`, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl and created + self.ttl <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(value), created
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl:
+            self._conn.execute("DELETE FROM entries WHERE created <= ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall()
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+# --- Both tiers ---
+
+class TieredCache:
+    """LRU memory tier in front of a SQLite tier stored under CACHE_DIR/<name>.sqlite3."""
+
+    def __init__(self, name, max_items=256, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.memory = LRUCache(max_items=max_items, ttl=ttl)
+        self.disk = SQLiteCache(os.path.join(CACHE_DIR, f"{name}.sqlite3"), max_bytes=max_bytes, ttl=ttl)
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is None:
+            entry = self.disk.get_entry(key)
+            if entry is None or entry[0] is None:
+                return default
+            # Keep the disk entry's age, so the memory copy expires with it
+            value, created = entry
+            self.memory.set(key, value, created=created)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
@@ -0,0 +1,108 @@
+import glob
+import os
+import threading
+import numpy as np
+import streamlit as st
+from modules.arrays import pack_strings, unpack_strings
+from modules.cache import CACHE_DIR
+from modules.summarizer import count_ngrams
+from modules.utils import get_setting
+
+IDF_MODEL_PATH = get_setting("IDF_MODEL_PATH", os.path.join(CACHE_DIR, "idf_model.npz"))
+IDF_SEED_DIR = get_setting("IDF_SEED_DIR", None)  # optional folder of .txt files
+IDF_MAX_TERMS = int(get_setting("IDF_MAX_TERMS", 2_000_000))
+
+
+class IdfModel:
+    """Document frequencies over every uploaded document, for corpus-level TF-IDF.
+
+    Frequencies live in one int32 array indexed through `vocabulary`
+    (term -> column). Documents are identified by content hash so the same
+    PDF is never counted twice.
+    """
+
+    def __init__(self, terms=(), doc_freq=None, documents=()):
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.doc_freq = np.zeros(len(self.vocabulary), dtype=np.int32) if doc_freq is None else doc_freq
+        self.documents = set(documents)
+        self._lock = threading.Lock()
+
+    @property
+    def num_docs(self):
+        return len(self.documents)
+
+    def add_document(self, doc_id, terms):
+        """Count `terms` (each once) as appearing in document `doc_id`; False if already counted."""
+        with self._lock:
+            if doc_id in self.documents:
+                return False
+            columns = np.fromiter(
+                (self.vocabulary.setdefault(term, len(self.vocabulary)) for term in terms), dtype=np.int64
+            )
+            if len(self.vocabulary) > len(self.doc_freq):
+                grown = np.zeros(max(len(self.vocabulary), 2 * len(self.doc_freq)), dtype=np.int32)
+                grown[:len(self.doc_freq)] = self.doc_freq
+                self.doc_freq = grown
+            self.doc_freq[np.unique(columns)] += 1
+            self.documents.add(doc_id)
+            if len(self.vocabulary) > IDF_MAX_TERMS:
+                self._prune()
+            return True
+
+    def _prune(self):
+        # Forget terms seen in a single document; they carry no corpus signal
+        terms = list(self.vocabulary)
+        keep = np.flatnonzero(self.doc_freq[:len(terms)] > 1)
+        self.vocabulary = {terms[i]: n for n, i in enumerate(keep)}
+        self.doc_freq = self.doc_freq[keep]
+
+    def idf(self, terms):
+        """Smoothed IDF, ln((1 + n) / (1 + df)) + 1 as in scikit-learn; unseen terms have df 0."""
+        # Under the lock: add_document and _prune update vocabulary and doc_freq in steps
+        with self._lock:
+            columns = np.fromiter((self.vocabulary.get(term, -1) for term in terms), dtype=np.int64, count=len(terms))
+            df = np.where(columns >= 0, self.doc_freq[np.maximum(columns, 0)], 0) if len(self.doc_freq) else 0
+            num_docs = len(self.documents)
+        return np.log((1 + num_docs) / (1 + df)) + 1
+
+    def save(self, path=IDF_MODEL_PATH):
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp.npz"
+            np.savez(
+                tmp_path,
+                terms=pack_strings(self.vocabulary),
+                doc_freq=self.doc_freq[:len(self.vocabulary)],
+                documents=pack_strings(sorted(self.documents)),
+            )
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=IDF_MODEL_PATH):
+        with np.load(path) as data:
+            return cls(unpack_strings(data["terms"]), data["doc_freq"].copy(), unpack_strings(data["documents"]))
+
+    @classmethod
+    def from_texts(cls, named_texts):
+        """Build a model from (doc_id, text) pairs."""
+        model = cls()
+        for doc_id, text in named_texts:
+            terms, _ = count_ngrams(text)
+            model.add_document(doc_id, terms.tolist())
+        return model
+
+
+def _read_seed_corpus(folder):
+    for path in sorted(glob.glob(os.path.join(folder, "*.txt"))):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            yield "seed:" + os.path.basename(path), f.read()
+
+@st.cache_resource
+def get_idf_model():
+    """The persisted model, or one built from IDF_SEED_DIR (or empty) on first run."""
+    if os.path.exists(IDF_MODEL_PATH):
+        return IdfModel.load()
+    model = IdfModel.from_texts(_read_seed_corpus(IDF_SEED_DIR)) if IDF_SEED_DIR else IdfModel()
+    if model.num_docs:
+        model.save()
+    return model
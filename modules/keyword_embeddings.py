@@ -0,0 +1,167 @@
+"""KeyBERT-style keywords: candidates ranked by similarity to the document.
+
+The statistical extractor's best candidates are embedded with a
+sentence-transformers model and re-ranked by cosine similarity to the
+document's embedding, with maximal marginal relevance so near-synonyms
+don't crowd out other topics.
+
+Phrase embeddings are kept on disk, keyed by a 64-bit hash of the phrase,
+so vocabulary shared between uploads is embedded once. Only new phrases go
+through the model, in large CPU batches.
+"""
+import os
+import threading
+import numpy as np
+import streamlit as st
+from modules.arrays import hash64
+from modules.cache import CACHE_DIR
+from modules.utils import get_setting
+
+EMBEDDING_MODEL = get_setting("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_STORE_DIR = get_setting("EMBEDDING_STORE_DIR", os.path.join(CACHE_DIR, "embeddings"))
+EMBEDDING_BATCH_SIZE = int(get_setting("EMBEDDING_BATCH_SIZE", 256))
+EMBEDDING_CANDIDATES = int(get_setting("EMBEDDING_CANDIDATES", 1000))  # TF-IDF candidates re-ranked
+KEYWORD_DIVERSITY = float(get_setting("KEYWORD_DIVERSITY", 0.3))  # 0 ranks by similarity alone
+PASSAGE_WORDS = 150  # within the model's 256-token input limit
+MAX_PASSAGES = 256  # evenly spaced passages that stand in for a long document
+
+# --- On-disk embedding store ---
+
+class EmbeddingStore:
+    """Unit vectors on disk, looked up by 64-bit phrase hash.
+
+    Vectors are appended to one float32 file that is memory-mapped for
+    reads; only the keys (8 bytes a phrase) and their sort order are held in
+    memory. Vectors are written before their keys, so an interrupted append
+    leaves unused rows, which the next append overwrites. One process writes
+    the store at a time.
+
+    Readers take the (sorted keys, order, vectors) snapshot in one read;
+    appends build a new one and swap it in whole, so lookups never mix the
+    two.
+    """
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self._keys_path = os.path.join(path, "keys.u64")
+        self._vectors_path = os.path.join(path, f"vectors.{dim}.f32")
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+    def _load(self):
+        keys = np.fromfile(self._keys_path, dtype=np.uint64) if os.path.exists(self._keys_path) else np.array([], dtype=np.uint64)
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dim) if os.path.exists(self._vectors_path) else 0
+        keys = keys[:rows]
+        order = np.argsort(keys, kind="stable")
+        vectors = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(keys), self.dim))
+            if len(keys) else np.empty((0, self.dim), dtype=np.float32)
+        )
+        self._snapshot = (keys[order], order, vectors)
+
+    def get(self, hashes):
+        """(vectors, found): stored vectors for `hashes`, with zero rows where `found` is False."""
+        sorted_keys, order, stored = self._snapshot
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        vectors = np.zeros((len(hashes), self.dim), dtype=np.float32)
+        positions = np.searchsorted(sorted_keys, hashes)
+        found = positions < len(sorted_keys)
+        found[found] = sorted_keys[positions[found]] == hashes[found]
+        if found.any():
+            vectors[found] = stored[order[positions[found]]]
+        return vectors, found
+
+    def add(self, hashes, vectors):
+        """Append `vectors` under `hashes`; hashes already stored are skipped."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        with self._lock:
+            sorted_keys = self._snapshot[0]
+            hashes, first = np.unique(hashes, return_index=True)
+            new = np.ones(len(hashes), dtype=bool)
+            if len(sorted_keys):
+                positions = np.minimum(np.searchsorted(sorted_keys, hashes), len(sorted_keys) - 1)
+                new = sorted_keys[positions] != hashes
+            if not new.any():
+                return
+            rows = len(sorted_keys)
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(rows * 4 * self.dim)  # drop rows an interrupted append left behind
+                f.write(np.ascontiguousarray(vectors[first[new]], dtype=np.float32).tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.truncate(rows * 8)
+                f.write(hashes[new].tobytes())
+            self._load()
+
+# --- Model ---
+
+@st.cache_resource
+def load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+@st.cache_resource
+def get_embedding_store():
+    model = load_embedding_model()
+    path = os.path.join(EMBEDDING_STORE_DIR, EMBEDDING_MODEL.replace("/", "--"))
+    return EmbeddingStore(path, model.get_sentence_embedding_dimension())
+
+def embed(texts):
+    """Unit-length float32 embeddings of `texts`, encoded in EMBEDDING_BATCH_SIZE batches."""
+    vectors = load_embedding_model().encode(
+        list(texts), batch_size=EMBEDDING_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True
+    )
+    return vectors.astype(np.float32, copy=False)
+
+def embed_phrases(phrases):
+    """Embeddings of `phrases`, running the model only on those not yet stored."""
+    store = get_embedding_store()
+    hashes = np.fromiter((hash64(phrase) for phrase in phrases), dtype=np.uint64, count=len(phrases))
+    vectors, found = store.get(hashes)
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        vectors[missing] = embed([phrases[i] for i in missing])
+        store.add(hashes[missing], vectors[missing])
+    return vectors
+
+def document_embedding(text):
+    """Normalised mean embedding of the text's passages (evenly spaced ones for long texts)."""
+    words = text.split()
+    passages = [" ".join(words[i:i + PASSAGE_WORDS]) for i in range(0, len(words), PASSAGE_WORDS)]
+    if len(passages) > MAX_PASSAGES:
+        passages = [passages[i] for i in np.linspace(0, len(passages) - 1, MAX_PASSAGES).astype(int)]
+    vector = embed(passages).mean(axis=0)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+# --- Ranking ---
+
+def max_marginal_relevance(document, vectors, k, diversity=KEYWORD_DIVERSITY):
+    """Indices of `k` rows of `vectors`, each the most similar to `document` net of its
+    similarity to those already chosen (weighted by `diversity`)."""
+    relevance = vectors @ document
+    chosen = [int(np.argmax(relevance))]
+    redundancy = vectors @ vectors[chosen[0]]
+    for _ in range(min(k, len(vectors)) - 1):
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        scores[chosen] = -np.inf
+        best = int(np.argmax(scores))
+        chosen.append(best)
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return chosen
+
+def extract_keywords_embedding(text, candidates=None, num_keywords=150, diversity=KEYWORD_DIVERSITY):
+    """The `num_keywords` of `candidates` that best represent `text`, best first.
+
+    `candidates` defaults to the top EMBEDDING_CANDIDATES TF-IDF keywords.
+    """
+    if candidates is None:
+        from modules.summarizer import extract_keywords_tfidf
+        candidates = extract_keywords_tfidf(text, EMBEDDING_CANDIDATES)
+    if not candidates or not text.strip():
+        return []
+    chosen = max_marginal_relevance(document_embedding(text), embed_phrases(candidates), num_keywords, diversity)
+    return [candidates[i] for i in chosen]
@@ -0,0 +1,202 @@
+import json
+import requests
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from modules.cache import TieredCache, content_key
+from modules.prompts import PROMPTS_VERSION
+from modules.utils import get_setting
+
+# --- Connection settings (override in .streamlit/secrets.toml) ---
+
+LLM_API_URL = get_setting("LLM_API_URL")
+POOL_SIZE = int(get_setting("LLM_POOL_SIZE", 10))
+CONNECT_TIMEOUT = float(get_setting("LLM_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(get_setting("LLM_READ_TIMEOUT", 120))
+MAX_RETRIES = int(get_setting("LLM_MAX_RETRIES", 2))
+MAX_WORKERS = int(get_setting("LLM_MAX_WORKERS", POOL_SIZE))
+
+# Statuses with which endpoints refuse a "stream": true request. Others (401,
+# 413, 429 after the session's retries...) would fail again without it.
+STREAM_UNSUPPORTED = frozenset({400, 404, 415, 422})
+
+# --- Response cache settings ---
+
+CACHE_TTL = float(get_setting("LLM_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ITEMS = int(get_setting("LLM_CACHE_MAX_ITEMS", 512))
+CACHE_MAX_BYTES = int(get_setting("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# --- Shared session ---
+
+@st.cache_resource
+def get_session():
+    """One keep-alive connection pool shared by every page and session."""
+    retry = Retry(
+        total=MAX_RETRIES,
+        read=0,  # a read timeout means the model is slow; resending only doubles the wait
+        backoff_factor=0.5,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def post_chat(messages, timeout=None, stream=False, **params):
+    """POST a chat completion request and return the raw response."""
+    if not LLM_API_URL:
+        raise RuntimeError("LLM_API_URL is not set in .streamlit/secrets.toml")
+    payload = {"messages": messages, **params}
+    if stream:
+        payload["stream"] = True
+    return get_session().post(
+        LLM_API_URL,
+        json=payload,
+        timeout=(CONNECT_TIMEOUT, timeout or READ_TIMEOUT),
+        stream=stream,
+    )
+
+
+def check_response(response):
+    """Raise for a non-2xx response, with the endpoint's error body in the message."""
+    if not response.ok:
+        raise requests.HTTPError(
+            f"{response.status_code} {response.reason} from the LLM endpoint: {response.text[:1000]}",
+            response=response,
+        )
+
+
+# --- Response cache ---
+
+@st.cache_resource
+def get_response_cache():
+    """Completions shared across sessions: memory LRU in front of a SQLite file."""
+    return TieredCache("llm_responses", max_items=CACHE_MAX_ITEMS, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL)
+
+
+def response_cache_key(messages, params):
+    return content_key(LLM_API_URL, messages, params, PROMPTS_VERSION)
+
+
+def _use_cache(cache, params):
+    # Only deterministic (temperature 0) requests are cached unless the caller opts in
+    return params.get("temperature") == 0 if cache is None else cache
+
+
+def chat_completion(messages, cache=None, refresh=False, timeout=None, **params):
+    """Return the completion text for `messages`.
+
+    Cached completions are reused when `cache` is on (the default for
+    temperature 0); `refresh=True` skips the lookup and stores a fresh answer.
+    """
+    cache = _use_cache(cache, params)
+    if cache:
+        key = response_cache_key(messages, params)
+        if not refresh:
+            cached = get_response_cache().get(key)
+            if cached is not None:
+                return cached
+
+    response = post_chat(messages, timeout=timeout, **params)
+    check_response(response)
+    content = response.json()["choices"][0]["message"]["content"]
+    if cache:
+        get_response_cache().set(key, content)
+    return content
+
+
+def stream_chat(messages, cache=None, refresh=False, timeout=None, **params):
+    """Yield the completion text in pieces as the endpoint sends them (SSE).
+
+    A cached completion is yielded in one piece; see `chat_completion` for
+    the `cache` and `refresh` flags.
+    """
+    cache = _use_cache(cache, params)
+    if cache:
+        key = response_cache_key(messages, params)
+        if not refresh:
+            cached = get_response_cache().get(key)
+            if cached is not None:
+                yield cached
+                return
+
+    parts = []
+    for token in _stream_tokens(messages, timeout, params, cache, refresh):
+        parts.append(token)
+        yield token
+    if cache:
+        get_response_cache().set(key, "".join(parts))
+
+
+def _stream_tokens(messages, timeout, params, cache, refresh):
+    # Endpoints that ignore `stream` and answer with plain JSON get their
+    # whole completion yielded at once; those that reject it are asked again
+    # without it.
+    with post_chat(messages, timeout=timeout, stream=True, **params) as response:
+        if response.status_code in STREAM_UNSUPPORTED:
+            yield chat_completion(messages, cache=cache, refresh=refresh, timeout=timeout, **params)
+            return
+        check_response(response)
+        if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+            yield response.json()["choices"][0]["message"]["content"]
+            return
+
+        response.encoding = "utf-8"  # SSE is always UTF-8; requests would guess Latin-1
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            token = choices[0].get("delta", {}).get("content")
+            if token:
+                yield token
+
+
+def call_llm(prompt, user_input=None, **params):
+    """Send `prompt` as the system message and `user_input` as the user message.
+
+    With no `user_input`, the prompt is sent as a single user message.
+    """
+    if user_input is None:
+        messages = [{"role": "user", "content": prompt}]
+    else:
+        messages = [
+            {"role": "system", "content": prompt.strip()},
+            {"role": "user", "content": user_input.strip()},
+        ]
+    return chat_completion(messages, **params)
+
+
+# --- Concurrent calls ---
+
+@st.cache_resource
+def get_executor():
+    """Worker threads for fanning out independent LLM calls."""
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="llm")
+
+
+def run_parallel(jobs, timeout=None):
+    """Run `jobs` ({key: callable}) concurrently and yield (key, result, error) as each finishes.
+
+    Jobs still running after `timeout` seconds are yielded with a TimeoutError,
+    so callers can render whatever did come back.
+    """
+    futures = {get_executor().submit(job): key for key, job in jobs.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            key = futures.pop(future)
+            try:
+                yield key, future.result(), None
+            except Exception as e:
+                yield key, None, e
+    except TimeoutError:
+        for future, key in futures.items():
+            future.cancel()
+            yield key, None, TimeoutError(f"No response within {timeout:g}s")
@@ -0,0 +1,132 @@
+"""Map-reduce summaries of documents too long to send to the LLM whole.
+
+Pages are packed into chunks of up to CHUNK_TOKENS without splitting a page
+(only a page longer than that is split, at sentence ends). The chunks are
+summarised concurrently (map), then the summaries are merged in groups,
+round after round, until one brief is left (reduce).
+
+Every call is deterministic and goes through the LLM response cache, which
+is keyed by the request's content. Summarising an edited or re-uploaded
+document again only calls the LLM for chunks whose text changed, and for
+the merges above them.
+"""
+from functools import partial
+from modules.llm_client import call_llm, run_parallel
+from modules.prompts import summary_prompts
+from modules.token_budget import count_tokens, input_budget, trim_text
+from modules.utils import get_setting
+
+CHUNK_TOKENS = int(get_setting("CHUNK_TOKENS", 3000))
+CHUNK_SUMMARY_TOKENS = int(get_setting("CHUNK_SUMMARY_TOKENS", 300))
+BRIEF_TOKENS = int(get_setting("BRIEF_TOKENS", 800))
+SEPARATOR = "\n\n---\n\n"
+WORDS_PER_TOKEN = 0.75  # for the length limits the prompts state in words
+
+# --- Chunking ---
+
+def split_text(text, max_tokens):
+    """`text` cut at sentence ends into pieces of at most `max_tokens` tokens."""
+    pieces = []
+    while text:
+        piece, _ = trim_text(text, max_tokens)
+        if not piece:  # a single "word" over the limit
+            piece = text
+        pieces.append(piece)
+        text = text[len(piece):].lstrip()
+    return pieces
+
+def chunk_pages(pages, max_tokens=CHUNK_TOKENS):
+    """Consecutive pages joined into chunks of at most `max_tokens` tokens.
+
+    Chunks are packed from the first page on, so pages added at the end or
+    edits that keep a page's length leave the earlier chunks unchanged.
+    """
+    chunks, current, used = [], [], 0
+    for page in pages:
+        page = page.strip()
+        if not page:
+            continue
+        for piece in split_text(page, max_tokens):
+            cost = count_tokens(piece) + 1
+            if current and used + cost > max_tokens:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def group_parts(parts, max_tokens):
+    """Consecutive `parts` grouped to at most `max_tokens` tokens each, at least two to a group."""
+    groups, current, used = [], [], 0
+    for part in parts:
+        cost = count_tokens(part + SEPARATOR)
+        if len(current) > 1 and used + cost > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(part)
+        used += cost
+    if len(current) == 1 and groups:
+        groups[-1].append(current[0])
+    elif current:
+        groups.append(current)
+    return groups
+
+# --- Map and reduce ---
+
+def summarize_parts(parts, stage, max_tokens):
+    """Yield (index, summary or None, error) for each of `parts` as its summary arrives."""
+    prompt = summary_prompts[stage].format(words=int(max_tokens * WORDS_PER_TOKEN))
+    jobs = {
+        i: partial(call_llm, prompt, part, temperature=0, max_tokens=max_tokens)
+        for i, part in enumerate(parts)
+    }
+    yield from run_parallel(jobs)
+
+def map_reduce_summary(pages, brief_tokens=BRIEF_TOKENS, progress=None):
+    """Condense `pages` into one brief of about `brief_tokens` tokens.
+
+    `progress(done, total, stage)` is called as each LLM call finishes.
+    Chunks whose summary fails are left out; if none comes back, the first
+    error (or a RuntimeError, if the summaries were all empty) is raised.
+    A document that fits in one chunk is summarised once, at full length.
+    Returns a dict with the "brief", the number of "chunks" and how
+    many "failed".
+    """
+    chunk_tokens = min(CHUNK_TOKENS, input_budget(summary_prompts["map"]))
+    chunks = chunk_pages(pages, chunk_tokens)
+    if not chunks:
+        return {"brief": "", "chunks": 0, "failed": 0}
+
+    summaries, errors = [None] * len(chunks), []
+    map_tokens = brief_tokens if len(chunks) == 1 else CHUNK_SUMMARY_TOKENS
+    for done, (i, summary, error) in enumerate(summarize_parts(chunks, "map", map_tokens), 1):
+        if error:
+            errors.append(error)
+        else:
+            summaries[i] = summary.strip()
+        if progress:
+            progress(done, len(chunks), "map")
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        if errors:
+            raise errors[0]
+        raise RuntimeError(f"The LLM returned an empty summary for all {len(chunks)} sections")
+
+    # Merge until one summary is left; the last merge writes the brief at full length
+    group_tokens = min(CHUNK_TOKENS, input_budget(summary_prompts["reduce"]))
+    while len(summaries) > 1:
+        groups = group_parts(summaries, group_tokens)
+        max_tokens = brief_tokens if len(groups) == 1 else CHUNK_SUMMARY_TOKENS
+        merged = [None] * len(groups)
+        for done, (i, summary, error) in enumerate(
+            summarize_parts([SEPARATOR.join(group) for group in groups], "reduce", max_tokens), 1
+        ):
+            if error:
+                raise error
+            merged[i] = summary.strip()
+            if progress:
+                progress(done, len(groups), "reduce")
+        summaries = merged
+    return {"brief": summaries[0], "chunks": len(chunks), "failed": len(errors)}
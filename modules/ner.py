@@ -0,0 +1,202 @@
+"""Named-entity recognition for name protection, batched for CPU inference.
+
+Long texts are split into overlapping windows of model tokens, so nothing is
+lost to the model's maximum length. Windows from every caller go through one
+micro-batcher thread, which groups whatever arrives within NER_MAX_WAIT_MS
+into a single batched forward pass. Entity offsets are mapped back to
+character positions in the caller's text.
+"""
+import importlib.util
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import streamlit as st
+from modules.cache import CACHE_DIR
+from modules.utils import get_setting
+
+NER_MODEL = get_setting("NER_MODEL", "Davlan/distilbert-base-multilingual-cased-ner-hrl")
+# "pytorch", "int8" (dynamically quantized Linear layers) or "onnx" (ONNX Runtime via optimum)
+NER_BACKEND = get_setting("NER_BACKEND", "pytorch")
+NER_ONNX_DIR = get_setting("NER_ONNX_DIR", os.path.join(CACHE_DIR, "ner_onnx"))
+NER_BATCH_SIZE = int(get_setting("NER_BATCH_SIZE", 8))
+NER_THREADS = int(get_setting("NER_THREADS", 0))  # torch intra-op threads; 0 keeps torch's default
+NER_MAX_WAIT_MS = float(get_setting("NER_MAX_WAIT_MS", 10))
+NER_WINDOW_TOKENS = int(get_setting("NER_WINDOW_TOKENS", 256))
+NER_WINDOW_OVERLAP = int(get_setting("NER_WINDOW_OVERLAP", 32))
+
+logger = logging.getLogger(__name__)
+
+
+# 30 names from many languages, plus a few typos; the reference text for NER checks
+NAMES_SAMPLE_TEXT = (
+    "John and Maria were exci-ted to meet their new classmates: François, Ahmed, Szymon, and Nguyen. "
+    "Hyeon-woo and Xi arrived early, chatting with Barack and Jose about the upcomming project. "
+    "Olamide, Svetlana, and Fatima joi'ned the group, soon followed by Yuki, Priya, and Lars. Anna "
+    "and Soren brought snaks, while Mikhail and Isabella set up the presentation. Chinedu, Helena, "
+    "and Rashid discussed their ideas with Leandro and Duong, as Aisha and Zeynep reviewed the "
+    "scedule. Vladislav, Sara, and Laszlo made sure everyone felt welcome, ensuring the team was "
+    "ready to collaborate on their assignment."
+)
+
+# --- Inference backends ---
+# Hosts are CPU-only: int8 and ONNX trade a little accuracy for speed and memory
+# (benchmarks/ner.py measures both against the full-precision model).
+
+def _load_pytorch():
+    from transformers import AutoModelForTokenClassification
+    return AutoModelForTokenClassification.from_pretrained(NER_MODEL).eval()
+
+def _load_int8():
+    import torch
+    return torch.ao.quantization.quantize_dynamic(_load_pytorch(), {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_onnx():
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForTokenClassification
+    options = onnxruntime.SessionOptions()
+    if NER_THREADS > 0:
+        options.intra_op_num_threads = NER_THREADS
+    # Exporting takes a while, so the graph is saved and reused
+    path = os.path.join(NER_ONNX_DIR, NER_MODEL.replace("/", "--"))
+    if os.path.isdir(path):
+        return ORTModelForTokenClassification.from_pretrained(path, session_options=options)
+    model = ORTModelForTokenClassification.from_pretrained(NER_MODEL, export=True, session_options=options)
+    model.save_pretrained(path)
+    return model
+
+NER_BACKENDS = {
+    "pytorch": (("torch",), _load_pytorch),
+    "int8": (("torch",), _load_int8),
+    "onnx": (("optimum", "onnxruntime"), _load_onnx),
+}
+
+def available_backends():
+    return [
+        name for name, (modules, _) in NER_BACKENDS.items()
+        if all(importlib.util.find_spec(module) for module in modules)
+    ]
+
+def _resolve_backend(backend):
+    backend = backend or NER_BACKEND
+    installed = available_backends()
+    if backend not in installed:
+        if not installed:
+            raise ImportError("No NER runtime installed: install torch, or optimum[onnxruntime]")
+        logger.warning("NER backend %r is not installed; using %r instead", backend, installed[0])
+        backend = installed[0]
+    return backend
+
+# Initialize NER pipeline once (cached for performance)
+@st.cache_resource
+def load_ner_model(backend=None):
+    from transformers import AutoTokenizer, pipeline
+    backend = _resolve_backend(backend)
+    if NER_THREADS > 0 and backend != "onnx":
+        import torch
+        torch.set_num_threads(NER_THREADS)
+    return pipeline(
+        "ner",
+        model=NER_BACKENDS[backend][1](),
+        tokenizer=AutoTokenizer.from_pretrained(NER_MODEL),
+        aggregation_strategy="simple",
+    )
+
+# --- Micro-batching ---
+
+class NerBatcher:
+    """Runs texts submitted from any thread through `ner` in shared batches.
+
+    The pipeline is only ever called from the batcher's own thread, so
+    concurrent sessions never run it at the same time.
+    """
+
+    def __init__(self, ner, batch_size=NER_BATCH_SIZE, max_wait=NER_MAX_WAIT_MS / 1000):
+        self.ner = ner
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="ner-batcher", daemon=True).start()
+
+    def submit(self, texts):
+        """One Future per text, resolving to that text's entity list."""
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        return futures
+
+    def __call__(self, texts):
+        return [future.result() for future in self.submit(texts)]
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                results = self.ner([text for text, _ in items], batch_size=self.batch_size)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), entities in zip(items, results):
+                future.set_result(entities)
+
+@st.cache_resource
+def get_ner_batcher():
+    return NerBatcher(load_ner_model())
+
+# --- Windowing ---
+
+@st.cache_resource
+def load_window_tokenizer():
+    """A tokenizer of its own for windowing, used from session threads.
+
+    The pipeline's tokenizer belongs to the batcher thread: it switches
+    truncation on for each batch, and a fast tokenizer whose settings change
+    while another thread uses it fails with "Already borrowed".
+    """
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(NER_MODEL)
+
+def token_windows(text, tokenizer, size=NER_WINDOW_TOKENS, overlap=NER_WINDOW_OVERLAP):
+    """(start, end, keep_from, keep_to) character ranges of overlapping token windows.
+
+    Each window's entities are kept only if they start in [keep_from, keep_to).
+    Those ranges meet halfway through each overlap, so every entity is taken
+    from the window where it has the most context on both sides.
+    """
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+    if len(offsets) <= size:
+        return [(0, len(text), 0, len(text))]
+    step = size - overlap
+    starts = list(range(0, len(offsets) - overlap, step))
+    windows = []
+    for n, first in enumerate(starts):
+        last = min(first + size, len(offsets)) - 1
+        keep_from = 0 if n == 0 else offsets[first + overlap // 2][0]
+        keep_to = len(text) if n == len(starts) - 1 else offsets[starts[n + 1] + overlap // 2][0]
+        windows.append((offsets[first][0], offsets[last][1], keep_from, keep_to))
+    return windows
+
+def find_entities(text):
+    """Entities in `text` as the pipeline returns them, with `start`/`end` offsets into `text`."""
+    if not text.strip():
+        return []
+    windows = token_windows(text, load_window_tokenizer())
+    results = get_ner_batcher()([text[start:end] for start, end, _, _ in windows])
+    entities = []
+    for (start, _, keep_from, keep_to), window_entities in zip(windows, results):
+        for entity in window_entities:
+            entity = dict(entity, start=entity["start"] + start, end=entity["end"] + start)
+            if keep_from <= entity["start"] < keep_to:
+                entities.append(entity)
+    return entities
@@ -1,8 +1,141 @@
-import PyPDF2
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ''
-    for page_num in range(len(pdf_reader.pages)):
-        page = pdf_reader.pages[page_num]
-        text += page.extract_text()
-    return text
+import importlib.util
+import math
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import streamlit as st
+from modules.utils import get_setting
+
+# --- Parser backends (PyMuPDF is much faster; PyPDF2 is the fallback) ---
+# Parsers are imported on first use so importing this module stays cheap.
+
+PDF_BACKEND = get_setting("PDF_BACKEND", "pymupdf")
+
+# Large documents are split into page ranges and extracted in worker processes
+PARALLEL_MIN_PAGES = int(get_setting("PDF_PARALLEL_MIN_PAGES", 64))
+PARALLEL_WORKERS = int(get_setting("PDF_PARALLEL_WORKERS", os.cpu_count() or 1))
+
+
+def _pymupdf():
+    try:
+        import pymupdf
+    except ImportError:
+        import fitz as pymupdf  # PyMuPDF < 1.24
+    return pymupdf
+
+# Parsers take the PDF as bytes or, in worker processes, as a file path
+
+def _open_pymupdf(source):
+    if isinstance(source, str):
+        return _pymupdf().open(source, filetype="pdf")
+    return _pymupdf().open(stream=source, filetype="pdf")
+
+def _iter_pages_pymupdf(source, start=0, stop=None):
+    with _open_pymupdf(source) as doc:
+        for page_num in range(start, doc.page_count if stop is None else stop):
+            yield doc[page_num].get_text()
+
+def _count_pages_pymupdf(source):
+    with _open_pymupdf(source) as doc:
+        return doc.page_count
+
+def _iter_pages_pypdf2(source, start=0, stop=None):
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(source if isinstance(source, str) else BytesIO(source))
+    for page in pdf_reader.pages[start:stop]:
+        yield page.extract_text() or ""
+
+def _count_pages_pypdf2(data):
+    import PyPDF2
+    return len(PyPDF2.PdfReader(BytesIO(data)).pages)
+
+BACKENDS = {
+    "pymupdf": (("pymupdf", "fitz"), _iter_pages_pymupdf, _count_pages_pymupdf),
+    "pypdf2": (("PyPDF2",), _iter_pages_pypdf2, _count_pages_pypdf2),
+}
+
+
+def available_backends():
+    return [
+        name for name, (modules, *_) in BACKENDS.items()
+        if any(importlib.util.find_spec(module) for module in modules)
+    ]
+
+def _resolve_backend(backend):
+    backend = backend or PDF_BACKEND
+    installed = available_backends()
+    if backend not in installed:
+        if not installed:
+            raise ImportError("No PDF parser installed: install PyMuPDF or PyPDF2")
+        backend = installed[0]
+    return backend
+
+def _read_bytes(pdf_file):
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, "getvalue"):  # Streamlit UploadedFile, BytesIO
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+# --- Public API ---
+
+def count_pdf_pages(pdf_file, backend=None):
+    backend = _resolve_backend(backend)
+    return BACKENDS[backend][2](_read_bytes(pdf_file))
+
+def iter_pdf_pages(pdf_file, backend=None, workers=None, max_pages=None):
+    """Yield the text of each page in order, stopping after `max_pages` if given.
+
+    `pdf_file` may be bytes or a file-like object. `backend` is "pymupdf" or
+    "pypdf2"; when the requested parser isn't installed the other one is used.
+    Documents with at least PARALLEL_MIN_PAGES pages are extracted across
+    `workers` processes (default PARALLEL_WORKERS) and yielded range by range.
+    """
+    data = _read_bytes(pdf_file)
+    backend = _resolve_backend(backend)
+    iter_pages, count_pages = BACKENDS[backend][1:]
+    workers = PARALLEL_WORKERS if workers is None else workers
+    if workers <= 1 and max_pages is None:
+        yield from iter_pages(data)
+        return
+
+    num_pages = count_pages(data)
+    if max_pages is not None:
+        num_pages = min(num_pages, max_pages)
+    if workers <= 1 or num_pages < PARALLEL_MIN_PAGES:
+        yield from iter_pages(data, 0, num_pages)
+        return
+
+    # A few ranges per worker so one slow range doesn't leave the others idle
+    range_size = math.ceil(num_pages / (workers * 2))
+    starts = range(0, num_pages, range_size)
+    stops = [min(start + range_size, num_pages) for start in starts]
+    n = len(starts)
+    pool = get_process_pool(workers)
+    # Workers open the document from a temporary file rather than each task
+    # being sent a pickled copy of it
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+    try:
+        # map() returns ranges in order, each as soon as it and those before it are done
+        for page_texts in pool.map(_extract_page_range, [f.name] * n, [backend] * n, starts, stops):
+            yield from page_texts
+    finally:
+        os.remove(f.name)
+
+def extract_text_from_pdf(pdf_file, backend=None, workers=None):
+    """Return the whole document text (see `iter_pdf_pages` for `workers`)."""
+    return "".join(iter_pdf_pages(pdf_file, backend, workers))
+
+# --- Process-pool extraction ---
+
+@st.cache_resource
+def get_process_pool(workers=PARALLEL_WORKERS):
+    # spawn, not fork: forking the threaded Streamlit server is unsafe
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _extract_page_range(path, backend, start, stop):
+    return list(BACKENDS[backend][1](path, start, stop))
@@ -1,4 +1,6 @@
-
+# Bump when prompts change meaning (or the model behind LLM_API_URL changes)
+# so cached completions from the old prompts are no longer reused.
+PROMPTS_VERSION = 1
 
 user_prompts = {
 "Differentiate Resource": """
@@ -558,3 +560,25 @@ User input starts in the next message:
 """
 
 }
+
+# Map-reduce summaries of long documents (modules/map_reduce.py); {words} is the length limit
+summary_prompts = {
+"map": """
+You are summarising one part of a longer teaching document so a teacher can plan from it.
+
+Write a concise summary of the text in the next message, in at most {words} words:
+- Keep the key topics, facts, definitions, examples and any learning objectives.
+- Keep names, numbers and subject terminology exactly as written.
+- Use short bullet points, in the order the text presents them.
+- Do not add anything that is not in the text, and do not comment on the text itself.
+""",
+"reduce": """
+You are combining summaries of consecutive parts of a teaching document into one brief.
+
+The summaries in the next message are separated by "---" and are in document order.
+Merge them into a single summary of at most {words} words:
+- Keep the document's order and structure; group related points under short headings.
+- Remove repetition, but keep every distinct topic, key term and learning objective.
+- Do not add anything that is not in the summaries.
+""",
+}
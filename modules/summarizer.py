@@ -1,10 +1,13 @@
+import importlib.util
 import re
-import base64
 from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from functools import partial
+import numpy as np
 from io import BytesIO
+from modules.utils import get_setting
+
+# scikit-learn and wordcloud are imported inside the functions that use them:
+# they cost seconds at import time and most app reruns never need them.
 
 # --- Regex-based tokenizers ---
 
@@ -32,54 +35,207 @@ STOPWORDS = set("""
     you've your yours yourself yourselves
 """.split())
 
-# --- Keyword Extraction Methods ---
-
-def extract_keywords_tfidf(text, num_keywords=150):
-    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
-    tfidf_matrix = vectorizer.fit_transform([text])
-    feature_names = vectorizer.get_feature_names_out()
-    scores = tfidf_matrix.toarray()[0]
-    ranked = sorted(zip(feature_names, scores), key=lambda x: x[1], reverse=True)
-    return [term for term, _ in ranked[:num_keywords]]
+# --- Keyword Extraction Engine ---
+
+# Words of two or more letters (the TextRank sentence vectors' tokens)
+TOKEN_PATTERN = r"(?u)\b[^\W\d]{2,}\b"
+# Keyword tokens: two or more word characters, or a lone digit ("Year 7")
+NGRAM_TOKEN = re.compile(r"(?u)\b(?:\w\w+|\d)\b")
+HAS_DIGIT = re.compile(r"\d")
+
+def ngram_analyzer(text, stop_words=frozenset()):
+    """Unigrams and bigrams of the non-stop-word tokens of `text`, from one pass.
+
+    Tokens with digits still take their place in the sequence, so no bigram
+    bridges a number ("plants 2023 uses" gives no "plants uses"), but no
+    n-gram containing one is kept.
+    """
+    tokens = [token for token in NGRAM_TOKEN.findall(text.lower()) if token not in stop_words]
+    words = [HAS_DIGIT.search(token) is None for token in tokens]
+    ngrams = [token for token, word in zip(tokens, words) if word]
+    ngrams += [
+        f"{first} {second}"
+        for first, second, word, next_word in zip(tokens, tokens[1:], words, words[1:])
+        if word and next_word
+    ]
+    return ngrams
+
+def count_ngrams(text):
+    """Unigram and bigram counts from a single tokenization pass.
+
+    Returns (terms, counts) as parallel NumPy arrays over the terms that
+    occur, with terms in alphabetical order. Nothing is densified.
+    """
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer
+    vectorizer = CountVectorizer(analyzer=partial(ngram_analyzer, stop_words=ENGLISH_STOP_WORDS))
+    try:
+        X = vectorizer.fit_transform([text])
+    except ValueError:  # empty vocabulary
+        return np.array([], dtype=str), np.array([], dtype=np.int64)
+    X.sort_indices()
+    return vectorizer.get_feature_names_out()[X.indices], X.data
+
+def top_k(terms, scores, k):
+    """The `k` highest-scoring terms, best first; ties keep the order of `terms`."""
+    if len(scores) > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx.sort()
+    else:
+        idx = np.arange(len(scores))
+    idx = idx[np.argsort(-scores[idx], kind="stable")]
+    return terms[idx].tolist()
+
+def tfidf_scores(terms, counts, idf_model=None):
+    """L2-normalised TF-IDF using corpus IDF from `idf_model` (see modules.idf_model).
+
+    Without a model this is the one-document case, where every IDF is equal.
+    """
+    scores = counts if idf_model is None else counts * idf_model.idf(terms)
+    return scores / (np.linalg.norm(scores) or 1.0)
+
+# "statistical" ranks by TF-IDF; "embedding" re-ranks the TF-IDF candidates by
+# similarity to the document (modules/keyword_embeddings.py, needs sentence-transformers)
+KEYWORD_EXTRACTORS = ("statistical", "embedding")
+KEYWORD_EXTRACTOR = get_setting("KEYWORD_EXTRACTOR", "statistical")
+
+def resolve_keyword_extractor(extractor=None):
+    extractor = extractor or KEYWORD_EXTRACTOR
+    if extractor not in KEYWORD_EXTRACTORS:
+        raise ValueError(f"Unknown keyword extractor {extractor!r}; choose from {', '.join(KEYWORD_EXTRACTORS)}")
+    if extractor == "embedding" and importlib.util.find_spec("sentence_transformers") is None:
+        return "statistical"
+    return extractor
+
+def rank_keywords(terms, counts, num_keywords=150, top_n=150, idf_model=None, text=None, extractor=None):
+    """The "TF-IDF" (or "Embedding") and "Noun Phrases" keyword lists from shared n-gram counts.
+
+    The embedding extractor needs the document `text`; without it the
+    statistical ranking is used.
+    """
+    is_phrase = np.char.find(terms.astype(str), " ") >= 0
+    scores = tfidf_scores(terms, counts, idf_model)
+    if text is not None and resolve_keyword_extractor(extractor) == "embedding":
+        from modules.keyword_embeddings import EMBEDDING_CANDIDATES, extract_keywords_embedding
+        ranked = {"Embedding": extract_keywords_embedding(text, top_k(terms, scores, EMBEDDING_CANDIDATES), num_keywords)}
+    else:
+        ranked = {"TF-IDF": top_k(terms, scores, num_keywords)}
+    ranked["Noun Phrases"] = top_k(terms[is_phrase], counts[is_phrase], top_n)
+    return ranked
+
+def extract_keywords_tfidf(text, num_keywords=150, idf_model=None):
+    terms, counts = count_ngrams(text)
+    return top_k(terms, tfidf_scores(terms, counts, idf_model), num_keywords)
 
 def extract_noun_phrases(text, top_n=150):
-    from sklearn.feature_extraction.text import CountVectorizer
-    vectorizer = CountVectorizer(ngram_range=(2, 2), stop_words='english')
-    X = vectorizer.fit_transform([text])
-    freqs = zip(vectorizer.get_feature_names_out(), X.toarray()[0])
-    sorted_phrases = sorted(freqs, key=lambda x: x[1], reverse=True)
-    return [phrase for phrase, count in sorted_phrases[:top_n]]
+    return rank_keywords(*count_ngrams(text), top_n=top_n)["Noun Phrases"]
+
+# --- Incremental keyword statistics ---
+
+class KeywordAccumulator:
+    """N-gram counts that grow one batch of pages at a time.
+
+    Each batch goes through `count_ngrams`, so the final lists match
+    `analyze_pdf` without tokenizing the whole text as one string. Bigrams
+    spanning two batches are lost.
+    """
 
+    def __init__(self):
+        self.counts = Counter()
 
-def remove_keywords_with_digits(keyword_list):
-    return [kw for kw in keyword_list if not re.search(r'\d', kw)]
+    def update(self, text):
+        terms, counts = count_ngrams(text)
+        self.counts.update(dict(zip(terms.tolist(), counts.tolist())))
+
+    def keywords(self, num_keywords=150, top_n=150, idf_model=None, text=None):
+        terms = np.array(list(self.counts), dtype=str)
+        counts = np.fromiter(self.counts.values(), dtype=np.int64, count=len(self.counts))
+        return rank_keywords(terms, counts, num_keywords, top_n, idf_model, text)
 
 # --- Word Cloud Generation ---
-def word_cloud(text):
-    wc = WordCloud(width=800, height=400, background_color='white', stopwords=STOPWORDS)
-    wc.generate(text)
+WORD_CLOUD_TERMS = 200  # WordCloud's own max_words default
+
+def word_cloud_frequencies(counts, max_terms=WORD_CLOUD_TERMS):
+    """The single-word counts a word cloud needs, most frequent first."""
+    return dict(Counter({term: count for term, count in counts.items() if " " not in term}).most_common(max_terms))
+
+def render_word_cloud(frequencies):
+    """PNG bytes of a word cloud drawn from term counts; None if there are no terms."""
+    if not frequencies:
+        return None
+    from wordcloud import WordCloud
+    wc = WordCloud(width=800, height=400, background_color='white', max_words=WORD_CLOUD_TERMS)
+    wc.generate_from_frequencies(frequencies)
     buffer = BytesIO()
     wc.to_image().save(buffer, format='PNG')
-    encoded = base64.b64encode(buffer.getvalue()).decode()
-    return encoded
+    return buffer.getvalue()
+
+# --- Extractive Summary (TextRank) ---
+SUMMARY_MIN_WORDS = 6    # shorter "sentences" are usually headings, captions or page furniture
+SUMMARY_MAX_WORDS = 80   # longer ones are usually tables or lists run together
+
+def summary_sentences(text):
+    """Candidate sentences with their whitespace collapsed (PDF text breaks lines mid-sentence)."""
+    sentences = (" ".join(s.split()) for s in regex_sent_tokenize(text))
+    return [s for s in sentences if SUMMARY_MIN_WORDS <= s.count(" ") + 1 <= SUMMARY_MAX_WORDS]
+
+def textrank_scores(sentences, damping=0.85, tol=1e-6, max_iter=100):
+    """TextRank centrality of each sentence over the TF-IDF cosine-similarity graph.
+
+    The graph's weights are X @ X.T for the sentence-term matrix X. The
+    n-by-n matrix is never built: each power-iteration step multiplies by
+    X and X.T instead, so the cost grows with the text, not its square.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    n = len(sentences)
+    if n < 2:
+        return np.ones(n)
+    vectorizer = TfidfVectorizer(stop_words='english', token_pattern=TOKEN_PATTERN, sublinear_tf=True)
+    try:
+        X = vectorizer.fit_transform(sentences)  # rows are L2-normalised
+    except ValueError:  # empty vocabulary
+        return np.ones(n)
+    XT = X.T.tocsr()
+    self_similarity = np.asarray(X.multiply(X).sum(axis=1)).ravel()  # diagonal, left out of the graph
+
+    # Each sentence passes its score on in proportion to its similarities;
+    # sentences sharing no terms with any other spread theirs evenly
+    out_weight = X @ (XT @ np.ones(n)) - self_similarity
+    dangling = out_weight <= 1e-12
+    out_weight[dangling] = 1
+    scores = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        share = np.where(dangling, 0, scores / out_weight)
+        passed = X @ (XT @ share) - self_similarity * share
+        updated = (1 - damping) / n + damping * (passed + scores[dangling].sum() / n)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+def textrank_summary(text, token_budget, count_tokens=None):
+    """The most central sentences of `text` that fit in `token_budget`, in document order.
+
+    `count_tokens` defaults to modules.token_budget.count_tokens.
+    """
+    if count_tokens is None:
+        from modules.token_budget import count_tokens
+    sentences = summary_sentences(text)
+    scores = textrank_scores(sentences)
+    chosen, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        cost = count_tokens(sentences[i]) + 1
+        if used + cost <= token_budget:
+            chosen.append(i)
+            used += cost
+    return " ".join(sentences[i] for i in sorted(chosen))
 
 # --- Main Analysis Function ---
-def analyze_pdf(text):
-    tfidf = extract_keywords_tfidf(text)
-    noun_phrases = extract_noun_phrases(text)
-
-    # Remove keywords with digits
-    tfidf_clean = remove_keywords_with_digits(tfidf)
-    noun_phrases_clean = remove_keywords_with_digits(noun_phrases)
-
-    keywords = {
-        "TF-IDF": tfidf_clean,
-        "Noun Phrases": noun_phrases_clean
-    }
-
-    wordcloud_img = word_cloud(text)
+def analyze_pdf(text, idf_model=None):
+    terms, counts = count_ngrams(text)
+    keywords = rank_keywords(terms, counts, idf_model=idf_model, text=text)
 
+    # The word cloud itself is only drawn if a view asks for it (render_word_cloud)
     return {
         "keywords": keywords,
-        "wordcloud": wordcloud_img
+        "frequencies": word_cloud_frequencies(dict(zip(terms.tolist(), counts.tolist())))
     }
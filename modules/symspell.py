@@ -0,0 +1,174 @@
+"""Spelling correction from a precomputed symmetric-delete index (SymSpell).
+
+Every dictionary word's prefix is expanded once into all strings reachable by
+deleting up to MAX_EDIT_DISTANCE characters. At lookup time the misspelt
+word's deletes are hashed and probed in that sorted table, so finding
+candidates is a handful of binary searches instead of generating every
+insertion, substitution and transposition.
+
+The index is a directory of .npy files opened memory-mapped, so it is shared
+by the OS page cache and only the pages that lookups touch are read.
+"""
+import os
+import shutil
+from array import array
+import numpy as np
+import streamlit as st
+from modules.arrays import hash64, pack_strings, unpack_strings
+from modules.cache import CACHE_DIR
+from modules.utils import get_setting
+
+SYMSPELL_INDEX_DIR = get_setting("SYMSPELL_INDEX_DIR", os.path.join(CACHE_DIR, "symspell"))
+MAX_EDIT_DISTANCE = int(get_setting("SYMSPELL_MAX_EDIT_DISTANCE", 2))
+PREFIX_LENGTH = int(get_setting("SYMSPELL_PREFIX_LENGTH", 7))
+
+ARRAYS = ("keys", "offsets", "word_ids", "words", "frequencies", "params")
+
+
+def _deletes(word, max_distance):
+    """`word` and every string made by deleting up to `max_distance` characters."""
+    found = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        frontier = [w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))]
+        frontier = [w for w in frontier if w not in found]
+        found.update(frontier)
+    return found
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance, or max_distance + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # A shared prefix or suffix never changes the distance; most candidates share both
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class SymSpellIndex:
+    """Sorted delete hashes (`keys`) with postings of dictionary word ids.
+
+    The word ids for keys[i] are word_ids[offsets[i]:offsets[i + 1]].
+    `unknown` and `correction` behave like pyspellchecker's, so either can
+    back `spellcheck_and_correct` in modules.text_processing.
+    """
+
+    def __init__(self, keys, offsets, word_ids, words, frequencies,
+                 max_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.keys = keys
+        self.offsets = offsets
+        self.word_ids = word_ids
+        self.words = words
+        self.frequencies = frequencies
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.vocabulary = {word: i for i, word in enumerate(words)}
+
+    @classmethod
+    def build(cls, word_frequencies, max_distance=MAX_EDIT_DISTANCE, prefix_length=PREFIX_LENGTH):
+        """Index a {word: count} mapping."""
+        words = [word for word in word_frequencies if word and "\n" not in word]
+        frequencies = np.fromiter((word_frequencies[word] for word in words), dtype=np.int64, count=len(words))
+        # array() keeps millions of (hash, id) pairs compact while they are collected
+        hashes, ids = array("Q"), array("i")
+        for word_id, word in enumerate(words):
+            deletes = _deletes(word[:prefix_length], max_distance)
+            hashes.extend(hash64(d) for d in deletes)
+            ids.extend([word_id] * len(deletes))
+        hashes = np.frombuffer(hashes, dtype=np.uint64)
+        ids = np.frombuffer(ids, dtype=np.int32)
+        order = np.argsort(hashes, kind="stable")
+        hashes, word_ids = hashes[order], ids[order]
+        keys, starts = np.unique(hashes, return_index=True)
+        offsets = np.append(starts, len(hashes)).astype(np.int64)
+        return cls(keys, offsets, word_ids, words, frequencies, max_distance, prefix_length)
+
+    def save(self, path=SYMSPELL_INDEX_DIR):
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        arrays = {
+            "keys": self.keys, "offsets": self.offsets, "word_ids": self.word_ids,
+            "words": pack_strings(self.words), "frequencies": self.frequencies,
+            "params": np.array([self.max_distance, self.prefix_length], dtype=np.int64),
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SYMSPELL_INDEX_DIR):
+        data = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        max_distance, prefix_length = (int(v) for v in data["params"])
+        return cls(data["keys"], data["offsets"], data["word_ids"], unpack_strings(data["words"]),
+                   data["frequencies"], max_distance, prefix_length)
+
+    def unknown(self, words):
+        """The lower-cased words that are not in the dictionary."""
+        return {word.lower() for word in words} - self.vocabulary.keys()
+
+    def candidates(self, word, max_distance=None):
+        """Dictionary word ids sharing a delete with `word`'s prefix."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        hashes = np.fromiter(
+            (hash64(d) for d in _deletes(word[:self.prefix_length], max_distance)), dtype=np.uint64
+        )
+        positions = np.searchsorted(self.keys, hashes)
+        inside = positions < len(self.keys)
+        positions, hashes = positions[inside], hashes[inside]
+        positions = positions[self.keys[positions] == hashes]
+        if not len(positions):
+            return np.array([], dtype=np.int32)
+        return np.unique(np.concatenate([self.word_ids[self.offsets[p]:self.offsets[p + 1]] for p in positions]))
+
+    def correction(self, word):
+        """The closest dictionary word, most frequent among equals; None if none is close enough."""
+        word = word.lower()
+        if word in self.vocabulary:
+            return word
+        # Most frequent first, so a candidate only replaces the best by being strictly
+        # closer; nothing is closer than 1 for a word that isn't in the dictionary
+        ids = self.candidates(word)
+        ids = ids[np.argsort(-self.frequencies[ids], kind="stable")].tolist()
+        best, limit = None, self.max_distance
+        for word_id in ids:
+            candidate = self.words[word_id]
+            distance = edit_distance(word, candidate, limit)
+            if distance <= limit:
+                best = candidate
+                if distance <= 1:
+                    break
+                limit = distance - 1
+        return best
+
+
+@st.cache_resource
+def get_symspell_index():
+    """The persisted index, built from pyspellchecker's English frequency list on first run."""
+    if os.path.isdir(SYMSPELL_INDEX_DIR):
+        index = SymSpellIndex.load()
+        if (index.max_distance, index.prefix_length) == (MAX_EDIT_DISTANCE, PREFIX_LENGTH):
+            return index
+    from spellchecker import SpellChecker
+    index = SymSpellIndex.build(SpellChecker().word_frequency.dictionary)
+    index.save()
+    return SymSpellIndex.load()
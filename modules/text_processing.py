@@ -0,0 +1,215 @@
+"""Text-cleaning pipeline: name protection, punctuation cleanup and spellchecking.
+
+No Streamlit UI here, so the main app and pages can import it without
+running a page script. Models are loaded on first use and cached per process.
+"""
+import re
+import streamlit as st
+from modules.cache import LRUCache
+from modules.ner import find_entities
+from modules.utils import get_setting
+
+# Corrections remembered across calls and sessions ((backend, lower-cased word) -> correction)
+SPELL_CACHE_SIZE = int(get_setting("SPELL_CACHE_SIZE", 50_000))
+# symspell looks corrections up in a precomputed delete index (see modules.symspell)
+SPELL_BACKENDS = ("pyspellchecker", "symspell", "autocorrect")
+SPELL_BACKEND = get_setting("SPELL_BACKEND", "pyspellchecker")
+
+# --- Speller backends ---
+# Each is loaded once per process and exposes pyspellchecker's unknown() and correction().
+
+# Initialize spellchecker once
+@st.cache_resource
+def load_spellchecker():
+    from spellchecker import SpellChecker
+    return SpellChecker()
+
+class AutocorrectSpeller:
+    """autocorrect.Speller behind the unknown()/correction() interface."""
+
+    def __init__(self, lang='en'):
+        from autocorrect import Speller
+        self.speller = Speller(lang=lang)
+
+    def unknown(self, words):
+        return {word.lower() for word in words} - self.speller.nlp_data.keys()
+
+    def correction(self, word):
+        return self.speller.autocorrect_word(word)
+
+@st.cache_resource
+def load_autocorrect():
+    return AutocorrectSpeller()
+
+def load_speller(backend=None):
+    """The speller for `backend` (one of SPELL_BACKENDS; default SPELL_BACKEND)."""
+    backend = backend or SPELL_BACKEND
+    if backend == "symspell":
+        from modules.symspell import get_symspell_index
+        return get_symspell_index()
+    if backend == "autocorrect":
+        return load_autocorrect()
+    if backend != "pyspellchecker":
+        raise ValueError(f"Unknown speller backend {backend!r}; expected one of {SPELL_BACKENDS}")
+    return load_spellchecker()
+
+@st.cache_resource
+def get_correction_cache():
+    return LRUCache(max_items=SPELL_CACHE_SIZE)
+
+def correct_words(words, backend=None):
+    """Corrections for the misspelt words among `words`, keyed by lower-cased word.
+
+    The dictionary is checked once for the whole set, and each candidate
+    search (the expensive part) runs at most once per word while it stays in
+    the correction cache. Words with no better candidate map to "" in the cache and
+    are left out of the result.
+    """
+    backend = backend or SPELL_BACKEND
+    spell = load_speller(backend)
+    cache = get_correction_cache()
+    fixes = {}
+    for word in spell.unknown(words):  # returned lower-cased
+        correction = cache.get((backend, word))
+        if correction is None:
+            correction = spell.correction(word)
+            correction = "" if correction in (None, word) else correction
+            cache.set((backend, word), correction)
+        if correction:
+            fixes[word] = correction
+    return fixes
+
+# --- Name protection ---
+# Names are handled as character spans: the text between them goes through
+# cleaning and spellchecking, and the names are put back by position.
+
+def merge_spans(spans):
+    """Sort (start, end) spans and merge those that overlap or touch."""
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(span) for span in merged]
+
+def name_spans(text):
+    """Merged character spans of the person names in `text`."""
+    return merge_spans((e['start'], e['end']) for e in find_entities(text) if e['entity_group'] == 'PER')
+
+def split_spans(text, spans):
+    """(gaps, names): the len(spans) + 1 pieces between sorted `spans`, and the text of each span."""
+    gaps, names = [], []
+    pos = 0
+    for start, end in spans:
+        gaps.append(text[pos:start])
+        names.append(text[start:end])
+        pos = end
+    gaps.append(text[pos:])
+    return gaps, names
+
+def join_spans(gaps, names):
+    """Inverse of `split_spans`: put `names` back between `gaps`."""
+    parts = [gaps[0]]
+    for name, gap in zip(names, gaps[1:]):
+        parts += [name, gap]
+    return ''.join(parts)
+
+# --- Cleaning ---
+# One compiled pattern finds, in order of precedence: a quoted span, a file path
+# with at least one internal slash/backslash, or stray punctuation inside a word.
+CLEANUP_PATTERN = re.compile(
+    r"""(?P<quote>(["'])(?:(?=(\\?))\3.)*?\2)"""
+    r"""|(?P<path>[A-Za-z]:[\\/][^\s"']+|[\\/](?:[^\s"']+[\\/])+[^\s"']+)"""
+    # The lookbehind follows the punctuation so every branch starts with a
+    # character class, which lets the regex engine skip ahead quickly
+    r"""|[,.;:!?\\/'-](?<=\w.)(?=\w)"""
+)
+
+def clean_user_input(text):
+    """Remove stray punctuation inside words, keeping file paths and quotes.
+
+    Quoted text is cleaned too, quotes kept. The text is scanned once from
+    left to right; a stack of pending ranges stands in for recursing into
+    quotes, and nothing is substituted and restored.
+    """
+    out = []
+    stack = [(0, len(text))]  # ranges still to scan, or str pieces to emit as-is
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            continue
+        pos, endpos = item
+        while True:
+            match = CLEANUP_PATTERN.search(text, pos, endpos)
+            if match is None:
+                out.append(text[pos:endpos])
+                break
+            start, end = match.span()
+            kind = match.lastgroup
+            if kind == 'path':
+                out.append(text[pos:end])
+            elif kind == 'quote':
+                # Opening quote now; the inside, closing quote and rest come next
+                out.append(text[pos:start + 1])
+                stack += [(end, endpos), text[end - 1], (start + 1, end - 1)]
+                break
+            else:
+                out.append(text[pos:start])  # drop the punctuation
+            pos = end
+    return ''.join(out)
+
+# --- Spellchecking ---
+
+def match_case(word, correction):
+    """`correction` in the case of `word`: all-caps and title-case words keep their capitals."""
+    if len(word) > 1 and word.isupper():
+        return correction.upper()
+    if word[0].isupper():
+        return correction[0].upper() + correction[1:]
+    return correction
+
+def spellcheck_segments(segments, backend=None):
+    """Spellcheck pieces of one document with a single dictionary pass over all of them."""
+    tokenized = [re.findall(r'\w+|[^\w\s]+|\s+', segment) for segment in segments]
+    fixes = correct_words({token for tokens in tokenized for token in tokens if token.isalpha()}, backend)
+    corrected = []
+    corrections = {}
+    for tokens in tokenized:
+        for i, token in enumerate(tokens):
+            correction = fixes.get(token.lower()) if token.isalpha() else None
+            # Spellers see lower-cased words; put the typed capitals back
+            correction = correction and match_case(token, correction)
+            if correction and correction != token:
+                corrections[token] = correction
+                tokens[i] = correction
+        corrected.append(''.join(tokens))
+    return corrected, corrections
+
+def spellcheck_and_correct(text, backend=None):
+    """(corrected text, corrections) for one piece of text (`backend` defaults to SPELL_BACKEND)."""
+    corrected, corrections = spellcheck_segments([text], backend)
+    return corrected[0], corrections
+
+def process_text(user_input, backend=None):
+    """Run the whole pipeline and return every stage's result.
+
+    Names are cut out by span before cleaning and put back by position
+    afterwards, so no placeholder can be damaged by cleaning or mistaken for
+    a word, and each name comes back exactly as it was typed.
+    """
+    gaps, names = split_spans(user_input, name_spans(user_input))
+    cleaned = [clean_user_input(gap) for gap in gaps]
+    corrected, corrections = spellcheck_segments(cleaned, backend)
+    return {
+        "names": names,
+        "cleaned_text": join_spans(cleaned, names),
+        "corrected_text": join_spans(corrected, names),
+        "corrections": corrections,
+    }
+
+def process_text_pipeline(
+    user_input
+):
+    return process_text(user_input)["corrected_text"]
@@ -0,0 +1,104 @@
+"""Token budgets that keep requests inside the model's context window.
+
+The budget for user content is what the context window has left after the
+prompt and the room reserved for the answer. Text over budget is cut at the
+last sentence that fits; keyword lists lose their lowest-ranked entries.
+Tokens are counted with tiktoken. If it is missing, or its encoding file
+can't be downloaded on first use (point TIKTOKEN_CACHE_DIR at a copy on
+offline hosts), they are estimated at about one token per four characters
+of each word.
+"""
+import importlib.util
+import logging
+import re
+import streamlit as st
+from modules.utils import get_setting
+
+CONTEXT_WINDOW = int(get_setting("CONTEXT_WINDOW", 8192))
+OUTPUT_TOKENS = int(get_setting("OUTPUT_TOKENS", 1024))  # room kept free for the answer
+TOKEN_ENCODING = get_setting("TOKEN_ENCODING", "cl100k_base")
+MESSAGE_OVERHEAD = 8  # role markers and separators added around each request
+KEYWORD_SHARE = 0.25  # budget share keywords may take when text and keywords don't both fit
+
+logger = logging.getLogger(__name__)
+
+APPROX_TOKENS = re.compile(r"\w+|[^\w\s]+")
+# A sentence ends at . ! or ? followed by whitespace, or at a blank line
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+|\n\s*\n")
+
+
+@st.cache_resource
+def get_encoding():
+    """The tiktoken encoding, or None to fall back to the estimate."""
+    if importlib.util.find_spec("tiktoken") is None:
+        return None
+    import tiktoken
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:  # the encoding file is downloaded on first use
+        logger.warning("Token encoding %r unavailable (%s); estimating token counts", TOKEN_ENCODING, e)
+        return None
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return sum((len(piece) + 3) // 4 for piece in APPROX_TOKENS.findall(text))
+    return len(encoding.encode(text, disallowed_special=()))
+
+def input_budget(*prompts):
+    """Tokens left for user content in a request that also carries `prompts`."""
+    used = OUTPUT_TOKENS + MESSAGE_OVERHEAD + sum(count_tokens(prompt) for prompt in prompts)
+    return max(CONTEXT_WINDOW - used, 0)
+
+# --- Trimming ---
+
+def trim_text(text, budget):
+    """(text, tokens saved): `text` cut after the last whole sentence within `budget` tokens.
+
+    If even the first sentence is over budget it is cut after the last word that fits.
+    """
+    total = count_tokens(text)
+    if total <= budget:
+        return text, 0
+    end, used = 0, 0
+    for match in SENTENCE_END.finditer(text):
+        cost = count_tokens(text[end:match.end()])
+        if used + cost > budget:
+            break
+        end, used = match.end(), used + cost
+    if end == 0:
+        for match in re.finditer(r"\S+\s*", text):
+            cost = count_tokens(match.group())
+            if used + cost > budget:
+                break
+            end, used = match.end(), used + cost
+    trimmed = text[:end].rstrip()
+    return trimmed, total - count_tokens(trimmed)
+
+def trim_keywords(keywords, budget, separator=", "):
+    """(keywords, tokens saved): the best-ranked `keywords` whose joined list fits `budget`."""
+    costs = [count_tokens(keyword + separator) for keyword in keywords]
+    kept, used = 0, 0
+    for cost in costs:
+        if used + cost > budget:
+            break
+        kept, used = kept + 1, used + cost
+    return keywords[:kept], sum(costs[kept:])
+
+def fit_input(text, keywords, budget):
+    """Trim user text and ranked keywords to `budget` tokens together.
+
+    Text comes first; keywords keep at least KEYWORD_SHARE of the budget when
+    both can't fit, plus whatever the text leaves unused. Returns a dict with
+    the trimmed "text" and "keywords", and the "tokens" sent and "saved".
+    """
+    text_tokens = count_tokens(text)
+    keyword_tokens = sum(count_tokens(keyword + ", ") for keyword in keywords)
+    if text_tokens + keyword_tokens <= budget:
+        return {"text": text, "keywords": keywords, "tokens": text_tokens + keyword_tokens, "saved": 0}
+
+    reserved = min(keyword_tokens, int(budget * KEYWORD_SHARE))
+    text, text_saved = trim_text(text, budget - reserved)
+    keywords, keywords_saved = trim_keywords(keywords, budget - (text_tokens - text_saved))
+    saved = text_saved + keywords_saved
+    return {"text": text, "keywords": keywords, "tokens": text_tokens + keyword_tokens - saved, "saved": saved}
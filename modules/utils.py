@@ -1,2 +1,12 @@
 import requests
+import streamlit as st
 from modules.prompts import user_prompts
+
+
+def get_setting(name, default=None):
+    """Read an optional setting from st.secrets, falling back to `default`."""
+    try:
+        return st.secrets.get(name, default)
+    except FileNotFoundError:
+        # No secrets.toml (e.g. running a benchmark script outside Streamlit)
+        return default
@@ -1,8 +1,7 @@
 import streamlit as st
-import requests
-
-# --- API endpoint (replace with your actual endpoint) ---
-LLM_API_URL = st.secrets["LLM_API_URL"]
+from functools import partial
+from modules.llm_client import CONNECT_TIMEOUT, call_llm, run_parallel
+from modules.token_budget import input_budget, trim_text
 
 st.set_page_config(page_title="Differentiate Resource", layout="centered")
 st.title("🧠 Differentiate Resource")
@@ -91,13 +90,14 @@ Content:
 """
 
 
-# --- LLM call helper ---
-def call_llm(prompt):
-    response = requests.post(
-        LLM_API_URL,
-        json={"messages": [{"role": "user", "content": prompt}]}
-    )
-    return response.json()["choices"][0]["message"]["content"]
+# --- Differentiation branches (each depends only on the analysis) ---
+branches = {
+    "challenge": ("#### 🏆 **Challenge Version**", challenge_prompt),
+    "scaffolded": ("#### 🛠️ **Scaffolded Version**", scaffolded_prompt),
+    "simplified": ("#### 🌱 **Simplified Version**", simplified_prompt),
+}
+BRANCH_TIMEOUT = 90  # seconds a branch may take before it is reported as missing
+ANALYSIS_TOKENS = 200  # room kept for the analysis that the branch prompts repeat
 
 # --- Differentiation workflow ---
 def differentiate_resource_chain(user_input):
@@ -111,28 +111,65 @@ def differentiate_resource_chain(user_input):
     simplified = call_llm(simplified_prompt.format(analysis=analysis, user_input=user_input))
     return analysis, challenge, scaffolded, simplified
 
+def differentiate_resource_concurrent(user_input):
+    """Run the analysis, then send the three branch prompts in parallel.
+
+    Returns the analysis and a generator of (branch, output, error) in completion order.
+    """
+    analysis = call_llm(analysis_prompt.format(user_input=user_input))
+    jobs = {
+        name: partial(call_llm, template.format(analysis=analysis, user_input=user_input), timeout=BRANCH_TIMEOUT)
+        for name, (_, template) in branches.items()
+    }
+    return analysis, run_parallel(jobs, timeout=BRANCH_TIMEOUT + CONNECT_TIMEOUT)
+
 # --- UI: Generate button ---
+run_concurrently = st.checkbox("Generate the three versions in parallel", value=True)
+
 if st.button("🚀 Differentiate Resource"):
     if not user_input.strip():
         st.warning("Please enter some lesson content.")
     else:
-        with st.spinner("Generating differentiated versions..."):
-            analysis, challenge, scaffolded, simplified = differentiate_resource_chain(user_input)
-       
-        st.markdown("#### 🏆 **Challenge Version**")
-        st.markdown(challenge)
-        st.markdown("---")
-        st.markdown("#### 🛠️ **Scaffolded Version**")
-        st.markdown(scaffolded)
-        st.markdown("---")
-        st.markdown("#### 🌱 **Simplified Version**")
-        st.markdown(simplified)
+        # The lesson text must fit alongside the longest branch prompt and the analysis
+        longest_prompt = max((template for _, template in branches.values()), key=len)
+        user_input, saved = trim_text(user_input, input_budget(longest_prompt) - ANALYSIS_TOKENS)
+        if saved:
+            st.info(f"✂️ Lesson content shortened to fit the model's context window ({saved:,} tokens left out).")
+
+        outputs = {}
+        if run_concurrently:
+            with st.spinner("Analysing resource..."):
+                analysis, results = differentiate_resource_concurrent(user_input)
+
+            # Reserve a slot per version so each renders as soon as it arrives
+            slots = {}
+            for i, (name, (heading, _)) in enumerate(branches.items()):
+                if i:
+                    st.markdown("---")
+                st.markdown(heading)
+                slots[name] = st.empty()
+                slots[name].info("Generating...")
+
+            for name, output, error in results:
+                if error:
+                    slots[name].warning(f"This version could not be generated: {error}")
+                else:
+                    outputs[name] = output
+                    slots[name].markdown(output)
+        else:
+            with st.spinner("Generating differentiated versions..."):
+                analysis, *versions = differentiate_resource_chain(user_input)
+            outputs = dict(zip(branches, versions))
+
+            for i, (name, (heading, _)) in enumerate(branches.items()):
+                if i:
+                    st.markdown("---")
+                st.markdown(heading)
+                st.markdown(outputs[name])
+
         # Download all versions as a text file
-        all_outputs = (
-            "Analysis:\n" + analysis +
-            "\n\n" + challenge +
-            "\n\n" + scaffolded +
-            "\n\n" + simplified
+        all_outputs = "Analysis:\n" + analysis + "".join(
+            "\n\n" + outputs[name] for name in branches if name in outputs
         )
         st.download_button("Download All Versions", data=all_outputs, file_name="differentiated_resource.txt")
 
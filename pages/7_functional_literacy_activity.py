@@ -1,8 +1,8 @@
 import streamlit as st
-import requests
 import re
+from modules.llm_client import chat_completion
+from modules.token_budget import input_budget, trim_text
 
-LLM_API_URL = st.secrets["LLM_API_URL"]
 revised_functional_lit_prompt = '''
 You are a literacy support teacher who creates scaffolded, real-world reading and writing activities to help students build functional literacy skills.
 
@@ -99,15 +99,8 @@ User input starts in below :
 '''
 
 
-def call_llm(prompt):
-    response = requests.post(
-        LLM_API_URL,
-        json={
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0
-        }
-    )
-    return response.json()["choices"][0]["message"]["content"]
+def call_llm(prompt, refresh=False):
+    return chat_completion([{"role": "user", "content": prompt}], temperature=0, refresh=refresh)
 
 def parse_functional_lit_output(output_text):
     obj = re.search(r'Objective:\s*(.+?)(?:\n|$)', output_text, re.DOTALL)
@@ -126,10 +119,15 @@ st.write(
 
 user_input = st.text_area("Describe the literacy scenario or skill (e.g., 'writing a shopping list', 'reading a bus timetable'):", height=150)
 
+regenerate = st.checkbox("🔁 Regenerate (don't reuse a saved answer)")
+
 if st.button("Generate Activity"):
+    user_input, saved = trim_text(user_input, input_budget(revised_functional_lit_prompt))
+    if saved:
+        st.info(f"✂️ Description shortened to fit the model's context window ({saved:,} tokens left out).")
     with st.spinner("Generating..."):
         prompt = revised_functional_lit_prompt + user_input
-        output = call_llm(prompt)
+        output = call_llm(prompt, refresh=regenerate)
         objective, activity, support_prompt = parse_functional_lit_output(output)
 
     st.markdown("#### Objective")
@@ -1,9 +1,8 @@
 import streamlit as st
-import requests
 import re
-
-# --- LLM API endpoint (replace with your actual endpoint) ---
-LLM_API_URL = st.secrets["LLM_API_URL"]
+from functools import partial
+from modules.llm_client import CONNECT_TIMEOUT, chat_completion, run_parallel
+from modules.token_budget import input_budget, trim_text
 
 st.set_page_config(page_title="Behavior Reflection Sheet", layout="centered")
 st.title("📝 Behavior Reflection Sheet Generator")
@@ -87,16 +86,30 @@ Student details/context:
 
 
 
+# One focus per sheet, so sheets generated at the same time still differ
+sheet_styles = [
+    "Focus the questions on what happened and what led up to it. Use breathing and body-based calming strategies.",
+    "Focus the questions on feelings: the student's own and other people's. Use sensory calming strategies.",
+    "Focus the questions on repairing harm and making things right. Use movement-based calming strategies.",
+    "Focus the questions on choices and what to do differently next time. Use thinking and self-talk calming strategies.",
+    "Focus the questions on who can help and where to find support. Use calming strategies that involve other people.",
+    "Focus the questions on the student's strengths and values. Use creative calming strategies (drawing, writing, music).",
+    "Focus the questions on the setting: time, place and people around. Use quiet, solo calming strategies.",
+]
+SHEET_TIMEOUT = 90  # seconds a sheet may take before it is reported as missing
+NEAR_DUPLICATE = 0.6  # trigram Jaccard at which two questions or strategies count as the same
+DUPLICATE_SHARE = 0.5  # share of near-duplicate items at which a sheet repeats another
+MAX_RETRIES = 2  # rounds of regenerating repeated sheets
+AVOID_LIST_TOKENS = 300  # room kept for the questions and strategies a regenerated sheet must avoid
+
 # --- LLM call helper ---
-def call_llm(prompt):
-    response = requests.post(
-        LLM_API_URL,
-        json={
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0  # Deterministic output
-        }
+def call_llm(prompt, refresh=False, timeout=None):
+    return chat_completion(
+        [{"role": "user", "content": prompt}],
+        temperature=0,  # Deterministic output, so repeats are served from the cache
+        refresh=refresh,
+        timeout=timeout
     )
-    return response.json()["choices"][0]["message"]["content"]
 
 # --- Output parsing function ---
 def parse_reflection_sheet(output_text):
@@ -116,7 +129,96 @@ def parse_reflection_sheet(output_text):
     return questions, strategies
 
 
-if st.button("Generate Reflection Sheets"):
+# --- Near-duplicate check ---
+def shingles(text):
+    # Character trigrams: rewordings like "shouted"/"started shouting" still overlap
+    text = " ".join(re.findall(r"[a-z']+", text.lower()))
+    return frozenset(text[i:i+3] for i in range(len(text) - 2))
+
+def repeated_share(sheet, other):
+    """Share of `sheet`'s questions and strategies that nearly repeat one in `other`."""
+    items = [shingles(t) for t in sheet["questions"] + sheet["strategies"]]
+    others = [shingles(t) for t in other["questions"] + other["strategies"]]
+    if not items:
+        return 0.0
+    repeated = sum(
+        any(len(a & b) >= NEAR_DUPLICATE * len(a | b) for b in others if a | b) for a in items
+    )
+    return repeated / len(items)
+
+def find_repeats(sheets):
+    """{index: index of the earlier kept sheet it repeats} for sheets that mostly repeat another."""
+    repeats = {}
+    for j, sheet in enumerate(sheets):
+        for i in range(j):
+            if i not in repeats and sheets[i] and sheet and repeated_share(sheet, sheets[i]) >= DUPLICATE_SHARE:
+                repeats[j] = i
+                break
+    return repeats
+
+# --- Concurrent generation ---
+def sheet_prompt(user_input, style, avoid=()):
+    prompt = reflection_prompt.format(user_input=user_input) + f"\nFor this sheet: {style}\n"
+    if avoid:
+        prompt += "Do not reuse any of these questions or calming strategies:\n" + "\n".join(f"- {item}" for item in avoid) + "\n"
+    return prompt
+
+def run_sheet_jobs(prompts, refresh):
+    """Generate {index: prompt} concurrently; yields (index, sheet or None, error) as each finishes."""
+    jobs = {i: partial(call_llm, prompt, refresh=refresh, timeout=SHEET_TIMEOUT) for i, prompt in prompts.items()}
+    for i, output, error in run_parallel(jobs, timeout=SHEET_TIMEOUT + CONNECT_TIMEOUT):
+        if error:
+            yield i, None, error
+        else:
+            questions, strategies = parse_reflection_sheet(output)
+            yield i, {"raw": output, "questions": questions, "strategies": strategies}, None
+
+
+regenerate = st.checkbox("🔁 Regenerate (don't reuse saved sheets)")
+run_concurrently = st.checkbox("Generate the sheets in parallel", value=True)
+
+generate = st.button("Generate Reflection Sheets")
+
+if generate:
+    # Leave room for the longest focus hint and a list of items to avoid
+    budget = input_budget(reflection_prompt, max(sheet_styles, key=len)) - AVOID_LIST_TOKENS
+    user_input, saved = trim_text(user_input, budget)
+    if saved:
+        st.info(f"✂️ Description shortened to fit the model's context window ({saved:,} tokens left out).")
+
+if generate and run_concurrently:
+    # Every sheet at once, each with its own focus; repeats are caught afterwards
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    sheets = [None] * num_sheets
+    prompts = {i: sheet_prompt(user_input, sheet_styles[i % len(sheet_styles)]) for i in range(num_sheets)}
+    next_style = num_sheets
+    for attempt in range(MAX_RETRIES + 1):
+        done = 0
+        status_text.text("Generating sheets..." if attempt == 0 else f"Regenerating {len(prompts)} repeated sheet(s)...")
+        for i, sheet, error in run_sheet_jobs(prompts, regenerate):
+            done += 1
+            progress_bar.progress(done / len(prompts))
+            if error:
+                st.error(f"Error generating sheet {i+1}: {error}")
+            else:
+                sheets[i] = sheet
+
+        # Regenerate only the sheets that mostly repeat an earlier one
+        repeats = find_repeats(sheets)
+        if not repeats or attempt == MAX_RETRIES:
+            break
+        prompts = {}
+        for j, i in repeats.items():
+            avoid = sheets[i]["questions"] + sheets[i]["strategies"]
+            prompts[j] = sheet_prompt(user_input, sheet_styles[next_style % len(sheet_styles)], avoid)
+            next_style += 1
+
+    st.session_state.generated_sheets = [sheet for sheet in sheets if sheet]
+    progress_bar.empty()
+    status_text.empty()
+
+elif generate:
     # Clear previous results
     st.session_state.generated_sheets = []
     previous_outputs = ""  # Holds all previous outputs as context
@@ -138,7 +240,7 @@ if st.button("Generate Reflection Sheets"):
                 )
 
 
-            output = call_llm(prompt)
+            output = call_llm(prompt, refresh=regenerate)
             questions, strategies = parse_reflection_sheet(output)
 
             st.session_state.generated_sheets.append({
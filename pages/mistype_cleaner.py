@@ -1,150 +1,22 @@
 import streamlit as st
-import re
-from transformers import pipeline
-from spellchecker import SpellChecker
+from modules.ner import NAMES_SAMPLE_TEXT
+from modules.text_processing import (
+    SPELL_BACKEND,
+    SPELL_BACKENDS,
+    get_correction_cache,
+    process_text,
+)
 
 st.set_page_config(layout="wide")
 
-# Initialize NER pipeline once (cached for performance)
-@st.cache_resource
-def load_ner_model():
-    return pipeline("ner", 
-                   model="Davlan/distilbert-base-multilingual-cased-ner-hrl",
-                   aggregation_strategy="simple")
-
-# Initialize spellchecker once
-@st.cache_resource
-def load_spellchecker():
-    return SpellChecker()
-
-ner = load_ner_model()
-spell = load_spellchecker()
-
-def extract_and_protect_names(text):
-    """Extract names and replace with placeholders"""
-    entities = ner(text)
-    protected = []
-    protected_names = []
-    
-    # Sort entities by start position (reverse order for safe replacement)
-    sorted_entities = sorted(entities, key=lambda x: x['start'], reverse=True)
-    
-    for i, entity in enumerate(sorted_entities):
-        if entity['entity_group'] == 'PER':
-            # Replace name with placeholder
-            placeholder = f"__NAME_{i}__"
-            text = text[:entity['start']] + placeholder + text[entity['end']:]
-            protected_names.append((placeholder, entity['word']))
-    
-    return text, protected_names
-
-def clean_user_input(text):
-    protected = []  # List of tuples: (type, content)
-    def protect_quotes(match):
-        protected.append(('quote', match.group(0)))
-        return f"__PROTECTED{len(protected)-1}__"
-    def protect_paths(match):
-        protected.append(('path', match.group(0)))
-        return f"__PROTECTED{len(protected)-1}__"
-
-    # Protect quoted text FIRST (so we don't protect paths inside quotes)
-    text = re.sub(r'(["\'])(?:(?=(\\?))\2.)*?\1', protect_quotes, text)
-    # Protect file paths with at least one internal slash/backslash
-    text = re.sub(
-        r'([A-Za-z]:[\\/][^\s"\']+|[\\/](?:[^\s"\']+[\\/])+[^\s"\']+)',
-        protect_paths,
-        text
-    )
-    # Remove stray punctuation including backslash and forward slash inside words
-    text = re.sub(r"(?<=\w)[,.;:!?\\\\/'-](?=\w)", '', text)
-
-    # Restore protected content
-    def restore(match):
-        idx = int(match.group(1))
-        typ, content = protected[idx]
-        if typ == 'quote':
-            # Recursively clean inside the quotes, but keep the quotes
-            quote_char = content[0]
-            inner = content[1:-1]
-            cleaned_inner = clean_user_input(inner)
-            return f"{quote_char}{cleaned_inner}{quote_char}"
-        else:
-            # For paths, just restore as-is
-            return content
-
-    text = re.sub(r'__PROTECTED(\d+)__', restore, text)
-    return text
-
-
-
-# # Cache the model and tokenizer to avoid reloading on every rerun
-# @st.cache_resource
-# def load_t5_spellchecker():
-#     tokenizer = AutoTokenizer.from_pretrained("Bhuvana/t5-base-spellchecker")
-#     model = AutoModelForSeq2SeqLM.from_pretrained("Bhuvana/t5-base-spellchecker")
-#     return tokenizer, model
-
-# tokenizer, model = load_t5_spellchecker()
-
-# def t5_spellcheck(text):
-#     input_ids = tokenizer.encode(text, return_tensors='pt')
-#     with torch.no_grad():
-#         sample_output = model.generate(
-#             input_ids,
-#             do_sample=True,
-#             max_length=100,
-#             top_p=0.99,
-#             num_return_sequences=1
-#         )
-#     result = tokenizer.decode(sample_output[0], skip_special_tokens=True)
-#     return result
-def spellcheck_and_correct(text, protected_names):
-    """Spellcheck while preserving protected names"""
-    # Convert protected names to dict for lookup
-    name_map = {ph: name for ph, name in protected_names}
-    
-    # Split into tokens (words and non-words)
-    tokens = re.findall(r'\w+|[^\w\s]+|\s+', text)
-    
-    corrected_tokens = []
-    corrections = {}
-    
-    for token in tokens:
-        if token in name_map:
-            # Restore protected names
-            corrected_tokens.append(name_map[token])
-        elif token.isalpha():
-            # Spellcheck normal words
-            if spell.unknown([token]):
-                correction = spell.correction(token)
-                if correction and correction != token:
-                    corrections[token] = correction
-                    corrected_tokens.append(correction)
-                else:
-                    corrected_tokens.append(token)
-            else:
-                corrected_tokens.append(token)
-        else:
-            corrected_tokens.append(token)
-    
-    return ''.join(corrected_tokens), corrections
-
-def process_text_pipeline(
-    user_input
-):
-    protected_text, protected_names = extract_and_protect_names(user_input)
-    cleaned_text = clean_user_input(protected_text)
-    corrected_text, _ = spellcheck_and_correct(cleaned_text, protected_names)
-    return corrected_text
-
 # Streamlit UI
 st.title("Smart Text Processor")
 st.markdown("""
 | Step          | What Happens                                                                      |
 |---------------|-----------------------------------------------------------------------------------|
-| NER           | Finds and protects names with placeholders using Hugging Face NER transformer.    |
+| NER           | Finds names with a Hugging Face NER transformer and sets their text spans aside.  |
 | Cleaning      | Uses Regex rules to removes stray punctuation, protects quoted text and file paths|
-| Spellchecking | Corrects spelling, skips protected names, uses spellchecker module                |
+| Spellchecking | Corrects spelling, skips protected names, uses the selected spellchecker          |
 | UI            | Lets user input text, shows results and corrections in a clear, structured way.   |
 """)
 
@@ -167,17 +39,24 @@ Below are 10 examples to test the text cleaning, and also a paragraph containing
 ---
 
 **Example Text (30 names, mispelling, mistyping and :**  
-John and Maria were exci-ted to meet their new classmates: François, Ahmed, Szymon, and Nguyen. Hyeon-woo and Xi arrived early, chatting with Barack and Jose about the upcomming project. Olamide, Svetlana, and Fatima joi'ned the group, soon followed by Yuki, Priya, and Lars. Anna and Soren brought snaks, while Mikhail and Isabella set up the presentation. Chinedu, Helena, and Rashid discussed their ideas with Leandro and Duong, as Aisha and Zeynep reviewed the scedule. Vladislav, Sara, and Laszlo made sure everyone felt welcome, ensuring the team was ready to collaborate on their assignment.
-""")
+""" + NAMES_SAMPLE_TEXT)
 user_input = st.text_area("Enter text:", height=150)
+# Other pages (e.g. autocorrect) can preselect a backend through session state
+st.session_state.setdefault("spell_backend", SPELL_BACKEND)
+backend = st.radio(
+    "Spellchecker", SPELL_BACKENDS, key="spell_backend", horizontal=True,
+    help="symspell looks corrections up in a precomputed index (built on first use)",
+)
 
 if st.button("Process Text"):
-    # Step 1: Extract and protect names
-    protected_text, protected_names = extract_and_protect_names(user_input)
+    # Names are protected by span, the text around them cleaned, then spellchecked
+    result = process_text(user_input, backend)
+    cleaned_text = result["cleaned_text"]
+    corrected_text = result["corrected_text"]
+    corrections = result["corrections"]
     st.subheader("Names Detected & Protected")
-    # st.write(protected_names)  # This will display the list of (placeholder, name) tuples
-    if protected_names:
-        names = [name for _, name in protected_names]
+    if result["names"]:
+        names = result["names"]
         n_cols = 6  # Adjust as needed
         rows = [names[i:i+n_cols] for i in range(0, len(names), n_cols)]
         for row in rows:
@@ -185,12 +64,6 @@ if st.button("Process Text"):
             for col, name in zip(cols, row):
                 col.write(f"🔒 {name}")
 
-    # Step 2: Clean text (with protected names)
-    cleaned_text = clean_user_input(protected_text)
-    
-    # Step 3: Spellcheck (while preserving protected names)
-    corrected_text, corrections = spellcheck_and_correct(cleaned_text, protected_names)
-
     # corrected_text = t5_spellcheck(cleaned)
     # col1, col2, col3 = st.columns(3)
     # with col1:
@@ -221,6 +94,8 @@ if st.button("Process Text"):
             st.subheader("Spelling Corrections")
             for wrong, right in corrections.items():
                 st.write(f"**{wrong}** → {right}")
+        stats = get_correction_cache().stats()
+        st.caption(f"Correction cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} words")
 
 
 # # Initialize spellchecker once